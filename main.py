@@ -1,21 +1,31 @@
 # /usr/bin/env python3
 """
-Module for capturing audio from an input stream, converting it to WAV format,
+Module for capturing audio from an input stream, encoding it as FLAC or WAV,
 and transcribing it via the OpenAI API.
 """
 
+import asyncio
+import functools
 import threading
-import queue
 import time
 import io
-import wave
-import numpy as np
+import queue
 import internal_logging as logging
-from transcribe_service.audio_capture import start_audio_capture, list_input_devices, audio_queue
-from transcribe_service.vad_processing import VoiceActivityDetector, vad_collector
-from transcribe_service.api_client import transcribe_audio, generate_topic_from_context
-from transcribe_service.config import LANGUAGE_CODE, CHANNELS, SAMPLERATE, SEGMENT_SECONDS
-from streaming_transcription import manage_streaming_with_reconnect
+from transcribe_service.audio_capture import start_audio_capture, list_input_devices, audio_ring, raise_thread_priority
+from transcribe_service.vad_processing import VoiceActivityDetector
+from transcribe_service.segmenter import VoiceSegmenter
+from transcribe_service.audio_encoding import encode_segment
+from transcribe_service.api_client import transcribe_audio_async, generate_topic_from_context_async, prewarm_connection
+from transcribe_service.config import (LANGUAGE_CODE, CHANNELS, SAMPLERATE, MAX_SEGMENT_SECONDS,
+                                       VAD_BUFFER_SECONDS, VAD_CALIBRATION_SECONDS, VAD_RECALIBRATION_SECONDS,
+                                       VAD_PADDING_MS, MAX_INFLIGHT_TRANSCRIPTIONS, PIPELINE_QUEUE_SIZE,
+                                       SILENCE_PEAK_THRESHOLD)
+from streaming_transcription import run_streaming
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 
 def select_audio_device(devices):
@@ -42,93 +52,178 @@ def select_audio_device(devices):
         except Exception:
             print("Invalid selection, using default input device.")
             device_to_use_index = default_input_idx
-    device = sd.query_devices(device_to_use_index)['name']
-    return device
+    # The listed devices already came from sd.query_devices(); only fall back to
+    # another PortAudio query if the default device is somehow not among them.
+    device_names = {orig_idx: dev['name'] for orig_idx, dev in devices}
+    if device_to_use_index in device_names:
+        return device_names[device_to_use_index]
+    return sd.query_devices(device_to_use_index)['name']
 
 
 logger = logging.logger
-vad_detector = VoiceActivityDetector(mode=1, frame_duration_ms=30)
+vad_detector = VoiceActivityDetector(mode=1, frame_duration_ms=30, silence_threshold=SILENCE_PEAK_THRESHOLD)
+
+# Upload buffers, reused once their transcription request has finished. Twice
+# the in-flight limit leaves room for segments still waiting for a request slot.
+_upload_pool = queue.Queue()
+for _ in range(2 * MAX_INFLIGHT_TRANSCRIPTIONS):
+    _upload_pool.put(io.BytesIO())
+
+
+PROMPT_WITH_PREV = (
+    "Topic: {topic}\n"
+    "Previous transcript: {prev}\n"
+    "Now, transcribe the current audio segment with proper punctuation and clarity:"
+)
+PROMPT_NO_PREV = (
+    "Topic: {topic}\n"
+    "Transcribe the current audio segment with proper punctuation and clarity:"
+)
+
+
+@functools.lru_cache(maxsize=1)
+def build_prompt(topic: str, prev_transcript: str) -> str:
+    """Build the transcription prompt, reusing the last one while its inputs are unchanged.
+
+    Parameters:
+        topic (str): The current transcription topic.
+        prev_transcript (str): The most recent completed transcript, or "" if none.
+
+    Returns:
+        str: The prompt for the next transcription request.
+    """
+    if prev_transcript:
+        return PROMPT_WITH_PREV.format(topic=topic, prev=prev_transcript)
+    return PROMPT_NO_PREV.format(topic=topic)
+
+
+def process_audio_segment(encode_queue: queue.Queue) -> None:
+    """Segment captured audio on VAD endpoints and hand each voiced segment to the encoder.
+
+    Runs in its own thread. New audio is read from the capture ring into a
+    VoiceSegmenter, which classifies it one VAD frame at a time once the first
+    VAD_CALIBRATION_SECONDS of audio have calibrated the detector; it is calibrated
+    again on silence every VAD_RECALIBRATION_SECONDS or so. A segment is dispatched
+    as soon as the VAD closes it, or once it reaches MAX_SEGMENT_SECONDS, instead of
+    after a fixed-length batch.
+
+    Parameters:
+        encode_queue (queue.Queue): Bounded queue of voiced int16 segments consumed by encode_segments.
+    """
+    segmenter = VoiceSegmenter(vad_detector, SAMPLERATE, CHANNELS, VAD_BUFFER_SECONDS, VAD_PADDING_MS,
+                               MAX_SEGMENT_SECONDS, VAD_CALIBRATION_SECONDS, VAD_RECALIBRATION_SECONDS)
+    while True:
+        audio_ring.data_ready.wait(timeout=1)
+        audio_ring.data_ready.clear()
+        n = min(audio_ring.available(), segmenter.free())
+        if not n:
+            continue
+        audio_ring.read_into(segmenter.receive(n))
+        for voiced in segmenter.segments():
+            encode_queue.put(voiced)
+
 
+def encode_segments(encode_queue: queue.Queue, loop: asyncio.AbstractEventLoop,
+                    segment_queue: asyncio.Queue) -> None:
+    """Encode voiced segments for upload and hand them to the dispatcher, in order.
 
-def process_audio_segment(initial_topic: str) -> None:
-    """Process audio segments by collecting audio frames from the queue, applying VAD, and transcribing speech.
+    Runs in its own thread so FLAC/WAV encoding overlaps with VAD on the next
+    segment; a full encode_queue blocks the VAD stage instead of growing.
+
+    Parameters:
+        encode_queue (queue.Queue): Voiced int16 segments produced by process_audio_segment.
+        loop (asyncio.AbstractEventLoop): The event loop running dispatch_transcriptions.
+        segment_queue (asyncio.Queue): Queue of upload file tuples consumed by the dispatcher.
+    """
+    while True:
+        voiced = encode_queue.get()
+        file_tuple = encode_segment(_upload_pool.get(), [voiced.data.cast('B')])
+        loop.call_soon_threadsafe(segment_queue.put_nowait, file_tuple)
+
+
+async def dispatch_transcriptions(initial_topic: str, segment_queue: asyncio.Queue) -> None:
+    """Transcribe voiced segments with several requests in flight, printing results in order.
+
+    Each segment taken from segment_queue is submitted immediately as its own task,
+    with at most MAX_INFLIGHT_TRANSCRIPTIONS requests running at once. A printer
+    coroutine follows the tasks in submission order so output order stays stable,
+    printing the head segment's text as it streams in while later segments buffer
+    theirs. It also tracks the transcript used to prompt later segments and refines
+    the topic in the background.
 
     Parameters:
         initial_topic (str): The initial topic for transcription.
+        segment_queue (asyncio.Queue): Queue of upload file tuples produced by encode_segments.
     """
     current_topic = initial_topic
-    full_transcript = ""
-    last_topic_update = time.time()
-    refinements = 0
-    frames_per_segment = SAMPLERATE * SEGMENT_SECONDS
     prev_transcript = ""
-    while True:
-        collected_frames = 0
-        segments = []
-        while collected_frames < frames_per_segment:
-            try:
-                data = audio_queue.get(timeout=1)
-                segments.append(data)
-                collected_frames += data.shape[0]
-            except queue.Empty:
-                if segments:
-                    break
-        if segments:
-            processed_chunks = [
-                (chunk * 32767).astype(np.int16).tobytes() for chunk in segments
-            ]
-            audio_data = b"".join(processed_chunks)
-            frames = list(vad_detector.frame_generator(audio_data, SAMPLERATE))
-            if not frames:
-                logger.info("No frames generated, skipping segment.")
-                continue
-            padded_voiced_segments = list(
-                vad_collector(
-                    SAMPLERATE,
-                    vad_detector.frame_duration_ms,
-                    300,
-                    vad_detector.vad,
-                    frames)
-            )
-            if not padded_voiced_segments:
-                logger.info(
-                    "Silence detected (via vad_collector), skipping transcription for this segment.")
-                continue
-            voiced_audio = b"".join(padded_voiced_segments)
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wf:
-                wf.setnchannels(CHANNELS)
-                wf.setsampwidth(2)
-                wf.setframerate(SAMPLERATE)
-                wf.writeframes(voiced_audio)
-            wav_buffer.seek(0)
-            file_tuple = ("audio.wav", wav_buffer, "audio/wav")
-            if prev_transcript:
-                prompt = (
-                    f"Topic: {current_topic}\n"
-                    f"Previous transcript: {prev_transcript}\n"
-                    "Now, transcribe the current audio segment with proper punctuation and clarity:"
-                )
-            else:
-                prompt = (
-                    f"Topic: {current_topic}\n"
-                    "Transcribe the current audio segment with proper punctuation and clarity:"
-                )
-            current_transcript = transcribe_audio(file_tuple, prompt, LANGUAGE_CODE)
-            if current_transcript:
-                print("Transcription:", current_transcript)
-                prev_transcript = current_transcript
-                full_transcript += "\n" + current_transcript
-                now = time.time()
-                if now - last_topic_update >= 60 and refinements < 10:
-                    new_topic = generate_topic_from_context(
-                        full_transcript, initial_topic, current_topic, LANGUAGE_CODE)
-                    logger.info("Refined topic: %s", new_topic)
-                    current_topic = new_topic
-                    last_topic_update = now
-                    refinements += 1
-        else:
-            time.sleep(0.1)
+    semaphore = asyncio.Semaphore(MAX_INFLIGHT_TRANSCRIPTIONS)
+    pending = asyncio.Queue()
+
+    async def transcribe_limited(file_tuple, prompt: str, deltas: asyncio.Queue) -> str:
+        try:
+            async with semaphore:
+                return await transcribe_audio_async(file_tuple, prompt, LANGUAGE_CODE, deltas.put_nowait)
+        finally:
+            _upload_pool.put(file_tuple[1])
+            deltas.put_nowait(None)
+
+    async def printer() -> None:
+        nonlocal current_topic, prev_transcript
+        full_transcript = ""
+        last_topic_update = time.time()
+        refinements = 0
+        refinement = None
+        try:
+            while True:
+                task, deltas = await pending.get()
+                started = False
+                while (delta := await deltas.get()) is not None:
+                    if not started:
+                        print("Transcription: ", end="")
+                        started = True
+                    print(delta, end="", flush=True)
+                current_transcript = await task
+                if started:
+                    print()
+                if refinement is not None and refinement.done():
+                    current_topic = refinement.result()
+                    logger.info("Refined topic: %s", current_topic)
+                    refinement = None
+                if current_transcript:
+                    prev_transcript = current_transcript
+                    full_transcript += "\n" + current_transcript
+                    now = time.time()
+                    if refinement is None and now - last_topic_update >= 60 and refinements < 10:
+                        # Runs alongside the next segments; picked up once it is done.
+                        refinement = asyncio.create_task(generate_topic_from_context_async(
+                            full_transcript, initial_topic, current_topic, LANGUAGE_CODE))
+                        last_topic_update = now
+                        refinements += 1
+        finally:
+            # An in-flight refinement is cancelled with the printer, not left pending.
+            if refinement is not None:
+                refinement.cancel()
+                await asyncio.gather(refinement, return_exceptions=True)
+
+    printer_task = asyncio.create_task(printer())
+    prewarm_task = asyncio.create_task(prewarm_connection())
+    try:
+        while True:
+            file_tuple = await segment_queue.get()
+            # Segments are submitted before earlier ones finish, so the prompt carries
+            # the most recent transcript that has completed so far.
+            prompt = build_prompt(current_topic, prev_transcript)
+            deltas = asyncio.Queue()
+            task = asyncio.create_task(transcribe_limited(file_tuple, prompt, deltas))
+            await pending.put((task, deltas))
+            if printer_task.done():
+                printer_task.result()
+    finally:
+        # Neither task outlives the dispatcher or leaves an exception unretrieved.
+        prewarm_task.cancel()
+        printer_task.cancel()
+        await asyncio.gather(prewarm_task, printer_task, return_exceptions=True)
 
 
 def main() -> None:
@@ -141,7 +236,6 @@ def main() -> None:
     devices = list_input_devices()
     if mode.lower() == "s":
         print("Starting streaming transcription mode.")
-        devices = list_input_devices()
         device_to_use = select_audio_device(devices)
         # Start audio capture in a separate thread
         thread = threading.Thread(
@@ -151,8 +245,7 @@ def main() -> None:
         thread.start()
         # Now run the streaming manager which will bridge the captured audio into
         # the streaming workflow.
-        import asyncio
-        asyncio.run(manage_streaming_with_reconnect())
+        run_streaming()
         return
     topic = input("Enter the transcription topic (press Enter for a generic topic): ")
     if not topic.strip():
@@ -160,10 +253,23 @@ def main() -> None:
         logger.info("Using default topic: 'general conversation'")
     else:
         logger.info("Using topic: '%s'", topic)
-    worker = threading.Thread(target=process_audio_segment, args=(topic,), daemon=True)
+    # The dispatcher loop drives every upload and streamed response; use uvloop when installed.
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    segment_queue = asyncio.Queue()
+    dispatcher = threading.Thread(
+        target=loop.run_until_complete,
+        args=(dispatch_transcriptions(topic, segment_queue),),
+        daemon=True)
+    dispatcher.start()
+    encode_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    encoder = threading.Thread(
+        target=encode_segments, args=(encode_queue, loop, segment_queue), daemon=True)
+    encoder.start()
+    worker = threading.Thread(
+        target=process_audio_segment, args=(encode_queue,), daemon=True)
     worker.start()
+    raise_thread_priority(worker.native_id)
 
-    devices = list_input_devices()
     device_to_use = select_audio_device(devices)
     start_audio_capture(device_to_use, CHANNELS, SAMPLERATE)
 
@@ -6,30 +6,103 @@ This module implements functions to:
 - Handle incoming transcription messages.
 - Manage error handling and reconnections.
 
-Each function below is a placeholder to be implemented in subsequent steps.
+Captured audio reaches the sender through drain_audio_ring and a PcmRing; run_session
+runs the sender and receiver side by side over one connection, and
+manage_streaming_with_reconnect restarts sessions with jittered backoff.
 """
 
 import asyncio
+import collections
+import functools
 import json
 import logging
 import websockets
+from binascii import b2a_base64
+from websockets.exceptions import ConnectionClosed, ConnectionClosedError, ConnectionClosedOK
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 
 logger = logging.getLogger(__name__)
 
+# JSON envelope of an input_audio_buffer.append message around its base64 audio field.
+_AUDIO_APPEND_PREFIX = b'{"type": "input_audio_buffer.append", "audio": "'
+_AUDIO_APPEND_SUFFIX = b'"}'
+# Largest amount of PCM sent in a single input_audio_buffer.append message.
+_MAX_CHUNK_BYTES = 32768
+# Close codes a server uses to refuse frames it does not accept: unsupported data, policy violation.
+_BINARY_REJECTED_CLOSE_CODES = (1003, 1008)
 
-async def connect_transcription_session():
-    """Establish a WebSocket connection to the streaming transcription service
-    and send the initial configuration payload.
+
+class PcmRing:
+    """A fixed ring of preallocated PCM buffers handed from drain_audio_ring to send_audio_chunks.
+
+    Both sides run on the event loop. The producer fills a slot in place with reserve()/commit(),
+    and the consumer takes it with get()/get_nowait(), which mirror asyncio.Queue. A returned
+    memoryview stays valid until the next get, so the sender can keep using it across an await.
     """
-    from transcribe_service.config import OPENAI_API_KEY, INPUT_AUDIO_FORMAT, STREAMING_MODEL, STREAMING_PROMPT, STREAMING_THRESHOLD, STREAMING_PREFIX_PADDING_MS, STREAMING_SILENCE_DURATION_MS, LANGUAGE_CODE
 
-    url = "wss://api.openai.com/v1/realtime?intent=transcription"
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "openai-beta": "realtime=v1"
-    }
-    ws = await websockets.connect(url, additional_headers=headers)
+    def __init__(self, slots: int, slot_bytes: int) -> None:
+        """Initialize the ring.
+
+        Parameters:
+            slots (int): Number of preallocated buffers.
+            slot_bytes (int): Size of each buffer in bytes.
+        """
+        self._slots = [bytearray(slot_bytes) for _ in range(slots)]
+        self._lengths = [0] * slots
+        self._ready = asyncio.Event()
+        # Monotonic slot counters; indices into _slots are taken modulo the slot count.
+        self.head = 0
+        self.tail = 0
+
+    def reserve(self):
+        """Return a writable memoryview of the next free slot, or None if every slot is in use."""
+        # One slot is held back for the buffer the consumer most recently took.
+        if self.tail - self.head >= len(self._slots) - 1:
+            return None
+        return memoryview(self._slots[self.tail % len(self._slots)])
+
+    def commit(self, nbytes: int) -> None:
+        """Publish the slot returned by reserve() holding nbytes of PCM."""
+        self._lengths[self.tail % len(self._slots)] = nbytes
+        self.tail += 1
+        self._ready.set()
+
+    def get_nowait(self):
+        """Return the oldest filled slot as a memoryview, raising asyncio.QueueEmpty if there is none."""
+        if self.head == self.tail:
+            raise asyncio.QueueEmpty
+        index = self.head % len(self._slots)
+        self.head += 1
+        return memoryview(self._slots[index])[:self._lengths[index]]
+
+    async def get(self):
+        """Wait for and return the oldest filled slot as a memoryview."""
+        while self.head == self.tail:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.get_nowait()
+
+
+@functools.lru_cache(maxsize=1)
+def _initial_payload_json() -> str:
+    """Build and serialize the initial transcription session configuration once.
+
+    The payload only depends on static configuration, so every reconnect reuses the
+    same JSON text instead of rebuilding the dict and re-encoding it. It is kept as
+    str rather than bytes so websockets sends it as a text frame.
+    """
+    from transcribe_service.config import INPUT_AUDIO_FORMAT, STREAMING_MODEL, STREAMING_PROMPT, STREAMING_THRESHOLD, STREAMING_PREFIX_PADDING_MS, STREAMING_SILENCE_DURATION_MS, LANGUAGE_CODE
 
     # Define the initial configuration payload for the transcription session.
     # The payload includes:
@@ -59,133 +132,397 @@ async def connect_transcription_session():
             },
             "include": ["item.input_audio_transcription.logprobs"]
         }}
-    await ws.send(json.dumps(initial_payload))
+    return json.dumps(initial_payload)
+
+
+async def connect_transcription_session():
+    """Establish a WebSocket connection to the streaming transcription service
+    and send the initial configuration payload.
+    """
+    from transcribe_service.config import OPENAI_API_KEY
+
+    url = "wss://api.openai.com/v1/realtime?intent=transcription"
+    headers = {
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "openai-beta": "realtime=v1"
+    }
+    ws = await websockets.connect(url, additional_headers=headers)
+    await ws.send(_initial_payload_json())
     logger.info("Sent initial configuration payload for transcription session.")
     return ws
 
 
-async def send_audio_chunks(ws, audio_source):
-    """Continuously send audio chunks from the audio_source over the WebSocket connection.
+class AudioSource:
+    """An unbounded FIFO backed by collections.deque, with the asyncio.Queue subset the sender uses.
+
+    put_nowait appends and sets a single Event; get waits on it only when the deque is empty,
+    so there is no per-item waiter bookkeeping. Items are passed by reference.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty source."""
+        self._items = collections.deque()
+        self._ready = asyncio.Event()
+
+    def qsize(self) -> int:
+        """Return the number of queued items."""
+        return len(self._items)
+
+    def put_nowait(self, item) -> None:
+        """Append item and wake a waiting consumer."""
+        self._items.append(item)
+        self._ready.set()
+
+    def get_nowait(self):
+        """Remove and return the oldest item, raising asyncio.QueueEmpty if there is none."""
+        try:
+            return self._items.popleft()
+        except IndexError:
+            raise asyncio.QueueEmpty from None
 
-    Each audio chunk is base64 encoded and sent as a JSON message with type 'input_audio_buffer.append'.
-    If a session ID is available, it is included in the payload.
+    async def get(self):
+        """Wait for and return the oldest item."""
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+
+def _build_append_frame(part):
+    """Return the input_audio_buffer.append JSON message carrying part as base64 audio.
+
+    The base64 audio is spliced into the fixed JSON envelope; base64 never needs JSON
+    escaping, so no dict or encoder is involved.
+    """
+    return _AUDIO_APPEND_PREFIX + b2a_base64(part, newline=False) + _AUDIO_APPEND_SUFFIX
+
+
+def _reject_binary(session, reason):
+    """Switch the stream to JSON audio messages after the server refused a binary frame.
+
+    session["binary"] stays cleared for later sessions that share the dict, so a server
+    that closes the connection on binary frames is not sent them again after reconnecting.
+    """
+    if session.get("binary"):
+        session["binary"] = False
+        logger.warning("Server rejected binary audio frames (%s), sending JSON messages instead.", reason)
+
+
+async def _write_frames(ws, frames, state):
+    """Send frames from the frames queue over the WebSocket connection in order.
+
+    Runs until cancelled or until the connection closes; the receiver then ends the session.
 
     Parameters:
         ws: The active WebSocket connection.
-        audio_source: An asynchronous source (e.g., an asyncio.Queue) providing audio chunks.
+        frames (AudioSource): (payload, text) tuples produced by send_audio_chunks.
+        state (dict): Session state shared with send_audio_chunks and the receiver; raw PCM
+            queued while "binary" was set is wrapped in JSON once the receiver clears it,
+            and "backlog" counts queued payload bytes.
     """
-    import asyncio
-    import base64
-    import json
-    max_chunk_size = 4096
-    overlap_size = 512
     while True:
+        payload, text = await frames.get()
+        state["backlog"] -= len(payload)
         try:
-            chunk = await audio_source.get()
-        except Exception:
-            await asyncio.sleep(0.01)
-            continue
-        if chunk is None or (hasattr(chunk, "size") and chunk.size == 0):
-            await asyncio.sleep(0.01)
-            continue
-        offset = 0
-        while offset < len(chunk):
-            part = chunk[offset: offset + max_chunk_size]
-            # Encode the audio data in base64
-            audio_b64 = base64.b64encode(part).decode('utf-8')
-            payload = {
-                "type": "input_audio_buffer.append",
-                "audio": audio_b64,
-            }
+            if not text:
+                if state["binary"]:
+                    await ws.send(payload)
+                    continue
+                payload = _build_append_frame(payload)
+            await ws.send(payload, text=True)
+        except ConnectionClosed as e:
+            logger.info("Connection closed, no more audio will be sent: %s", e)
+            return
+        except Exception as e:
+            logger.error("Error sending audio chunk: %s", e)
+
+
+def _queue_frame(frames, state, payload, text, max_backlog_bytes):
+    """Queue a frame for _write_frames, dropping the oldest queued frames past max_backlog_bytes.
+
+    When the connection stalls, websockets blocks the writer on its own buffer limits and
+    frames pile up here instead; stale audio is dropped so latency stays bounded.
+    """
+    frames.put_nowait((payload, text))
+    state["backlog"] += len(payload)
+    dropped = 0
+    while state["backlog"] > max_backlog_bytes and frames.qsize() > 1:
+        old_payload, _ = frames.get_nowait()
+        state["backlog"] -= len(old_payload)
+        dropped += 1
+    if dropped:
+        logger.warning("Streaming connection is behind, dropped %d queued audio frames.", dropped)
+
+
+async def send_audio_chunks(ws, audio_source, binary=False, max_backlog_bytes=None, session=None):
+    """Continuously send audio chunks from the audio_source over the WebSocket connection.
+
+    Each audio chunk, together with any chunks queued behind it or arriving within
+    STREAMING_COALESCE_MS (up to max_chunk_size bytes), is base64 encoded and sent as
+    a JSON message with type 'input_audio_buffer.append'.
+    The message envelope is fixed, so every frame shares the same prebuilt prefix and suffix.
+    Frames are handed to a writer task, so building the next frame never waits on the previous send.
+
+    Parameters:
+        ws: The active WebSocket connection.
+        audio_source: An asynchronous source (an AudioSource, PcmRing or asyncio.Queue) providing audio chunks.
+        binary (bool): Send the raw PCM as binary frames instead. Ignored if session is given.
+        max_backlog_bytes (int): Frames waiting for the writer beyond this many bytes are dropped,
+            oldest first. Defaults to STREAMING_MAX_BACKLOG_BYTES.
+        session (dict): State shared with handle_incoming_transcriptions. Its "binary" entry
+            selects binary frames and is cleared by the receiver if the server rejects them.
+    """
+    from transcribe_service.config import STREAMING_COALESCE_MS, STREAMING_MAX_BACKLOG_BYTES
+    if max_backlog_bytes is None:
+        max_backlog_bytes = STREAMING_MAX_BACKLOG_BYTES
+    max_chunk_size = _MAX_CHUNK_BYTES
+    coalesce_seconds = STREAMING_COALESCE_MS / 1000
+    loop = asyncio.get_running_loop()
+    state = session if session is not None else {"binary": binary}
+    state["backlog"] = 0
+    frames = AudioSource()
+    writer = asyncio.create_task(_write_frames(ws, frames, state))
+    try:
+        while True:
             try:
-                await ws.send(json.dumps(payload))
-            except Exception as e:
-                logger.error("Error sending audio chunk: %s", e)
-                break
-            offset += (max_chunk_size -
-                       overlap_size) if max_chunk_size > overlap_size else max_chunk_size
+                chunk = await audio_source.get()
+            except Exception:
+                await asyncio.sleep(0.01)
+                continue
+            if chunk is None or (hasattr(chunk, "size") and chunk.size == 0):
+                await asyncio.sleep(0.01)
+                continue
+            # Coalesce what is already queued, plus whatever arrives within the coalescing
+            # window, into the same frame, so audio goes out as a few larger frames rather
+            # than one small frame per capture callback. The bytes are copied as they arrive
+            # because the source may reuse its buffers while we wait.
+            batch = bytearray(chunk)
+            deadline = loop.time() + coalesce_seconds
+            while len(batch) < max_chunk_size:
+                try:
+                    extra = audio_source.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        extra = await asyncio.wait_for(audio_source.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if extra is not None:
+                    batch += extra
+            # Slicing a memoryview is zero-copy; base64 encodes straight from the view.
+            view = memoryview(batch)
+            for offset in range(0, len(view), max_chunk_size):
+                part = view[offset: offset + max_chunk_size]
+                # Queued frames must own their bytes: the source may reuse its buffer.
+                if state["binary"]:
+                    _queue_frame(frames, state, bytes(part), False, max_backlog_bytes)
+                else:
+                    _queue_frame(frames, state, _build_append_frame(part), True, max_backlog_bytes)
+    finally:
+        writer.cancel()
 
 
 async def audio_buffer_generator(audio_source):
     """Generate audio buffers from an audio source.
 
     This async generator retrieves audio chunks from an asynchronous source (e.g., asyncio.Queue)
-    and converts them to PCM byte format suitable for streaming.
+    and converts them to 16-bit PCM suitable for streaming. The arrays are yielded as-is rather
+    than as bytes; send_audio_chunks base64-encodes straight from a memoryview of them.
 
     Parameters:
-        audio_source: An asynchronous source (e.g., asyncio.Queue) that yields audio chunks as NumPy arrays.
+        audio_source: An asynchronous source (e.g., asyncio.Queue) that yields audio chunks as
+            int16 NumPy arrays, or float arrays in [-1.0, 1.0].
 
     Yields:
-        bytes: PCM audio data in bytes (16-bit little-endian).
+        np.ndarray: int16 PCM samples. A converted float chunk lives in a reused buffer and is
+            only valid until the next iteration.
     """
     import numpy as np
+    scaled = scratch = None
     while True:
         chunk = await audio_source.get()
-        pcm_bytes = (chunk * 32767).astype(np.int16).tobytes()
-        yield pcm_bytes
+        if chunk.dtype == np.int16:
+            yield chunk
+            continue
+        # Scale and clip in a reused float32 buffer, then cast into a reused int16 buffer;
+        # without the clip, samples just outside [-1.0, 1.0] would wrap around.
+        if scratch is None or scratch.shape != chunk.shape:
+            scaled = np.empty(chunk.shape, dtype=np.float32)
+            scratch = np.empty(chunk.shape, dtype=np.int16)
+        np.multiply(chunk, 32767, out=scaled, casting='unsafe')
+        np.clip(scaled, -32768, 32767, out=scaled)
+        np.copyto(scratch, scaled, casting='unsafe')
+        yield scratch
 
 
-async def audio_bridge(audio_source):
-    """Bridge the global audio_queue from audio_capture into the async audio_source queue."""
-    from transcribe_service.audio_capture import audio_queue
-    import asyncio
-    while True:
-        if not audio_queue.empty():
-            item = audio_queue.get()
-            await audio_source.put(item)
-        else:
-            await asyncio.sleep(0.01)
+def drain_audio_ring(pcm_ring):
+    """Move everything captured so far from the global audio_ring into pcm_ring.
+
+    Runs on the event loop, scheduled by the capture thread through the ring's on_data hook.
+    When every slot is taken the remaining frames stay in audio_ring until the next wakeup.
+
+    Parameters:
+        pcm_ring (PcmRing): The ring consumed by send_audio_chunks.
+    """
+    from transcribe_service.audio_capture import audio_ring
+    import numpy as np
+    channels = audio_ring.buf.shape[1]
+    frame_bytes = channels * audio_ring.buf.itemsize
+    available = audio_ring.available()
+    while available:
+        slot = pcm_ring.reserve()
+        if slot is None:
+            break
+        n = min(available, len(slot) // frame_bytes)
+        # Read straight into the PCM slot handed to the sender: the only copy
+        # between the capture ring and base64 encoding.
+        audio_ring.read_into(np.frombuffer(slot, np.int16, count=n * channels).reshape(n, channels))
+        pcm_ring.commit(n * frame_bytes)
+        available -= n
+
+
+def _on_session_created(data, state):
+    logger.info("Session created: %s", data)
+
+
+def _on_session_updated(data, state):
+    logger.info("Session updated: %s", data)
+
+
+def _on_transcription_delta(data, state):
+    delta = data.get("delta", "")
+    state["parts"].append(delta)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Delta transcription: %s", delta)
 
 
-async def handle_incoming_transcriptions(ws):
+def _on_transcription_completed(data, state):
+    parts = state["parts"]
+    parts.append(data.get("transcript", ""))
+    print("Final transcription:", "".join(parts))
+    parts.clear()
+
+
+def _on_error(data, state):
+    error = data.get("error", data)
+    logger.error("Realtime API error: %s", error)
+    # While binary audio is on, an invalid request is taken to be the server refusing it.
+    if state.get("binary") and isinstance(error, dict) and error.get("type") == "invalid_request_error":
+        _reject_binary(state, error.get("message", "invalid_request_error"))
+
+
+# Handlers for each realtime event type, called as handler(data, state).
+_HANDLERS = {
+    "error": _on_error,
+    "transcription_session.created": _on_session_created,
+    "transcription_session.updated": _on_session_updated,
+    "conversation.item.input_audio_transcription.delta": _on_transcription_delta,
+    "conversation.item.input_audio_transcription.completed": _on_transcription_completed,
+}
+
+
+async def handle_incoming_transcriptions(ws, session=None):
     """Handle incoming transcription messages from the WebSocket connection.
 
+    Each message is routed by its type through _HANDLERS. Deltas are only logged at debug
+    level; the completed transcript of each turn is printed. While session["binary"] is set,
+    an invalid-request error event or a 1003/1008 close clears it, so the sender and later
+    sessions fall back to JSON audio messages.
+
     Parameters:
         ws: The active WebSocket connection.
+        session (dict): State shared with send_audio_chunks.
     """
-    import json
-    transcript = ""
+    state = session if session is not None else {}
+    # Deltas of the current turn, joined once when the turn completes.
+    state["parts"] = []
+    # Every handled event type contains one of these; anything else would only be logged
+    # as unknown, so it is not worth parsing unless that log is enabled.
+    parse_all = logger.isEnabledFor(logging.INFO)
     try:
-        async for message in ws:
+        while True:
             try:
-                data = json.loads(message)
-                event_type = data.get("type")
-                if event_type == "transcription_session.created":
-                    logger.info("Session created: %s", data)
-                    continue
-                elif event_type == "transcription_session.updated":
-                    logger.info("Session updated: %s", data)
-                    continue
-                elif event_type == "conversation.item.input_audio_transcription.delta":
-                    delta = data.get("delta", "")
-                    transcript += delta
-                    print("Delta transcription:", delta)
-                    continue
-                elif event_type == "conversation.item.input_audio_transcription.completed":
-                    final_transcript = data.get("transcript", "")
-                    transcript += final_transcript
-                    print("Final transcription:", transcript)
-                    transcript = ""
-                    continue
-                else:
+                # Text frames come back as UTF-8 bytes: the JSON parser decodes them anyway,
+                # so websockets skips building an intermediate str.
+                message = await ws.recv(decode=False)
+            except ConnectionClosedOK:
+                return
+            except ConnectionClosedError as e:
+                if e.rcvd is not None and e.rcvd.code in _BINARY_REJECTED_CLOSE_CODES:
+                    _reject_binary(state, f"close code {e.rcvd.code}")
+                raise
+            if not parse_all and b"transcription" not in message and b"error" not in message:
+                continue
+            try:
+                data = _loads(message)
+                handler = _HANDLERS.get(data.get("type"))
+                if handler is not None:
+                    handler(data, state)
+                elif logger.isEnabledFor(logging.INFO):
                     logger.info("Unknown message: %s", data)
             except Exception as e:
-                print("Error processing message:", e)
+                logger.error("Error processing message: %s", e)
     except Exception as e:
-        print("Error receiving messages:", e)
+        logger.error("Error receiving messages: %s", e)
+
 
+async def run_session(ws, audio_source, binary=False, session=None):
+    """Send audio and receive transcriptions over ws concurrently, as one full-duplex session.
 
-async def manage_streaming():
+    The session ends as soon as either side finishes, typically when the receiver sees the
+    connection close; the other side is then cancelled so the caller can reconnect, and any
+    exception raised by the finished side is propagated.
+
+    Parameters:
+        ws: The active WebSocket connection.
+        audio_source: The source of audio chunks passed to send_audio_chunks.
+        binary (bool): Send binary audio frames; ignored if session is given.
+        session (dict): State shared by the sender and receiver, which may outlive the
+            session; its "binary" entry is cleared if the server rejects binary frames.
+    """
+    if session is None:
+        session = {"binary": binary}
+    tasks = [asyncio.create_task(send_audio_chunks(ws, audio_source, session=session)),
+             asyncio.create_task(handle_incoming_transcriptions(ws, session))]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for task in done:
+        task.result()
+
+
+async def manage_streaming(session=None):
     """Manage the overall streaming workflow including connection,
     sending audio data, and handling incoming messages with error handling
     and reconnection logic.
+
+    Parameters:
+        session (dict): Stream state kept across reconnects, passed to run_session.
+            Defaults to a new one with "binary" set from STREAMING_BINARY_AUDIO.
     """
+    from transcribe_service.audio_capture import audio_ring
+    from transcribe_service.config import (SAMPLERATE, STREAMING_BINARY_AUDIO, STREAMING_COALESCE_MS,
+                                           STREAMING_PCM_SLOTS)
     ws = await connect_transcription_session()
-    audio_source = asyncio.Queue()
-    bridge_task = asyncio.create_task(audio_bridge(audio_source))
-    sending_task = asyncio.create_task(send_audio_chunks(ws, audio_source))
-    receiving_task = asyncio.create_task(handle_incoming_transcriptions(ws))
-    await asyncio.gather(sending_task, receiving_task, bridge_task)
+    audio_source = PcmRing(STREAMING_PCM_SLOTS, _MAX_CHUNK_BYTES)
+    loop = asyncio.get_running_loop()
+    # Audio captured while disconnected is stale; a new session starts from the last
+    # coalescing window instead of replaying up to a whole ring of old speech.
+    stale = audio_ring.skip_to_latest(SAMPLERATE * STREAMING_COALESCE_MS // 1000)
+    if stale:
+        logger.info("Skipped %.1f seconds of audio captured before the session started.", stale / SAMPLERATE)
+    # The capture thread wakes the loop after each callback instead of the loop polling the ring.
+    audio_ring.on_data = functools.partial(loop.call_soon_threadsafe, drain_audio_ring, audio_source)
+    try:
+        await run_session(ws, audio_source, session=session if session is not None
+                          else {"binary": STREAMING_BINARY_AUDIO})
+    finally:
+        audio_ring.on_data = None
 
 
 async def manage_streaming_with_reconnect():
@@ -193,15 +530,38 @@ async def manage_streaming_with_reconnect():
 
     This function wraps the connection and streaming logic in a resilient loop. If the session
     fails due to an exception, it will wait for an exponentially increasing delay before reconnecting.
+    The delay uses decorrelated jitter so clients do not retry in lockstep, and starts over
+    after a session that stayed up for at least stable_session seconds.
     """
-    delay = 1
+    import random
+    import time
+    from transcribe_service.config import STREAMING_BINARY_AUDIO
+    # Shared by every session, so a binary audio rejection carries over to the reconnects.
+    session = {"binary": STREAMING_BINARY_AUDIO}
+    base_delay = 1.0
+    delay = base_delay
     max_delay = 60
+    stable_session = 30
     while True:
+        started = time.monotonic()
         try:
             logging.getLogger(__name__).info("Starting streaming session.")
-            await manage_streaming()
+            await manage_streaming(session)
         except Exception as e:
             logging.getLogger(__name__).error("Streaming session terminated unexpectedly: %s", e)
-        logging.getLogger(__name__).info("Reconnecting in %d seconds...", delay)
+        if time.monotonic() - started >= stable_session:
+            delay = base_delay
+        logging.getLogger(__name__).info("Reconnecting in %.1f seconds...", delay)
         await asyncio.sleep(delay)
-        delay = min(delay * 2, max_delay)
+        delay = min(max_delay, random.uniform(base_delay, delay * 3))
+
+
+def run_streaming():
+    """Run manage_streaming_with_reconnect to completion on the fastest available event loop.
+
+    uvloop is used when installed; otherwise this falls back to the default asyncio loop.
+    """
+    if uvloop is not None:
+        uvloop.run(manage_streaming_with_reconnect())
+    else:
+        asyncio.run(manage_streaming_with_reconnect())
@@ -1,30 +1,113 @@
 #!/usr/bin/env python3
 import unittest
 import numpy as np
-from transcribe_service.audio_capture import enque_audio, audio_queue
+from transcribe_service.audio_capture import enque_audio, audio_ring, AudioRing
+
 
 class TestEnqueAudio(unittest.TestCase):
-    def test_enque_audio_places_copy_in_queue(self) -> None:
-        # Clear the queue before testing
-        while not audio_queue.empty():
-            audio_queue.get()
+    def test_enque_audio_copies_into_ring(self) -> None:
+        # Discard anything already in the ring before testing
+        audio_ring.r = audio_ring.w
 
-        # Create a small NumPy array
-        test_array = np.array([1, 2, 3, 4], dtype=np.float32)
+        # Create a small NumPy array shaped like a PortAudio callback block
+        test_array = np.array([[1], [2], [3], [4]], dtype=np.int16)
         # Call enque_audio function with dummy values for frames, time_info, and status
         enque_audio(test_array, 4, {}, None)
 
-        # Verify the queue now contains one item
-        self.assertFalse(audio_queue.empty(), "audio_queue should have one element")
-        queued_item = audio_queue.get()
+        # Verify the ring now holds the four frames
+        self.assertEqual(audio_ring.available(), 4, "audio_ring should hold four frames")
+        queued = np.empty((4, 1), np.int16)
+        audio_ring.read_into(queued)
+        self.assertEqual(audio_ring.available(), 0)
 
-        # Check that the queued item is equal to the original array data
-        np.testing.assert_array_equal(queued_item, test_array)
+        # Check that the read frames are equal to the original array data
+        np.testing.assert_array_equal(queued, test_array)
 
-        # Modify the original array to ensure the enqueued item is a copy
+        # Modify the original array to ensure the ring holds a copy
         test_array[0] = 99
-        # The enqueued item should remain unchanged
-        self.assertNotEqual(queued_item[0], test_array[0], "Enqueued audio should be a copy, not a reference")
+        # The ring contents should remain unchanged
+        self.assertNotEqual(queued[0, 0], test_array[0, 0], "Enqueued audio should be a copy, not a reference")
+
+
+class TestAudioRing(unittest.TestCase):
+    def test_write_and_read_wrap_around(self) -> None:
+        ring = AudioRing(capacity_frames=8, channels=1, notify_frames=4)
+        first = np.arange(6, dtype=np.int16).reshape(6, 1)
+        ring.write(first)
+        self.assertTrue(ring.data_ready.is_set())
+        out = np.empty((6, 1), np.int16)
+        ring.read_into(out)
+        np.testing.assert_array_equal(out, first)
+
+        # This block straddles the end of the buffer.
+        second = np.arange(10, 15, dtype=np.int16).reshape(5, 1)
+        ring.write(second)
+        self.assertEqual(ring.available(), 5)
+        out = np.empty((5, 1), np.int16)
+        ring.read_into(out)
+        np.testing.assert_array_equal(out, second)
+
+    def test_overrun_drops_oldest_frames(self) -> None:
+        ring = AudioRing(capacity_frames=8, channels=1, notify_frames=4)
+        for start in (0, 5, 10):
+            ring.write(np.arange(start, start + 5, dtype=np.int16).reshape(5, 1))
+        # 15 frames were written into a ring of 8: the first 7 are gone.
+        self.assertEqual(ring.available(), 8)
+        self.assertEqual(ring.dropped, 7)
+        out = np.empty((8, 1), np.int16)
+        ring.read_into(out)
+        np.testing.assert_array_equal(out[:, 0], np.arange(7, 15, dtype=np.int16))
+
+    def test_block_larger_than_ring_keeps_newest_frames(self) -> None:
+        ring = AudioRing(capacity_frames=8, channels=1, notify_frames=4)
+        ring.write(np.arange(3, dtype=np.int16).reshape(3, 1))
+        ring.write(np.arange(100, 120, dtype=np.int16).reshape(20, 1))
+        self.assertEqual(ring.available(), 8)
+        self.assertEqual(ring.dropped, 15)
+        out = np.empty((8, 1), np.int16)
+        ring.read_into(out)
+        np.testing.assert_array_equal(out[:, 0], np.arange(112, 120, dtype=np.int16))
+
+    def test_overrun_warnings_are_throttled(self) -> None:
+        ring = AudioRing(capacity_frames=4, channels=1, notify_frames=4)
+        with self.assertLogs(level="WARNING") as logs:
+            for _ in range(3):
+                ring.write(np.zeros((6, 1), np.int16))
+                ring.available()
+        # Three overruns in quick succession are reported once; the total is still counted.
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(ring.dropped, 14)
+
+    def test_skip_to_latest_keeps_newest_frames(self) -> None:
+        ring = AudioRing(capacity_frames=8, channels=1, notify_frames=4)
+        ring.write(np.arange(6, dtype=np.int16).reshape(6, 1))
+        self.assertEqual(ring.skip_to_latest(2), 4)
+        out = np.empty((2, 1), np.int16)
+        ring.read_into(out)
+        np.testing.assert_array_equal(out[:, 0], [4, 5])
+        self.assertEqual(ring.skip_to_latest(2), 0)
+        self.assertEqual(ring.dropped, 0)
+
+    def test_skip_to_latest_after_lapping_is_not_an_overrun(self) -> None:
+        ring = AudioRing(capacity_frames=8, channels=1, notify_frames=4)
+        for start in (0, 5, 10):
+            ring.write(np.arange(start, start + 5, dtype=np.int16).reshape(5, 1))
+        with self.assertNoLogs(level="WARNING"):
+            self.assertEqual(ring.skip_to_latest(2), 13)
+        self.assertEqual(ring.dropped, 0)
+        self.assertEqual(ring.available(), 2)
+        out = np.empty((2, 1), np.int16)
+        ring.read_into(out)
+        np.testing.assert_array_equal(out[:, 0], [13, 14])
+
+    def test_on_data_runs_after_every_write(self) -> None:
+        ring = AudioRing(capacity_frames=8, channels=1, notify_frames=4)
+        seen = []
+        ring.on_data = lambda: seen.append(ring.available())
+        ring.write(np.zeros((1, 1), np.int16))
+        ring.write(np.zeros((2, 1), np.int16))
+        self.assertEqual(seen, [1, 3])
+
 
 if __name__ == '__main__':
     unittest.main()
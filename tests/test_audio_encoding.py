@@ -0,0 +1,55 @@
+import io
+import unittest
+import wave
+import numpy as np
+from transcribe_service.audio_encoding import sf, write_flac, write_wav
+from transcribe_service.config import CHANNELS, SAMPLERATE
+
+
+class TestWriteWav(unittest.TestCase):
+    def reference_wav(self, pcm: bytes) -> bytes:
+        # Build the reference file the way process_audio_segment used to.
+        reference = io.BytesIO()
+        with wave.open(reference, 'wb') as wf:
+            wf.setnchannels(CHANNELS)
+            wf.setsampwidth(2)
+            wf.setframerate(SAMPLERATE)
+            wf.writeframes(pcm)
+        return reference.getvalue()
+
+    def test_matches_wave_module_output(self):
+        chunks = [bytes(range(256)) * 10, b"\x01\x02" * 300]
+        buffer = io.BytesIO()
+        write_wav(buffer, chunks)
+        self.assertEqual(buffer.tell(), 0)
+        self.assertEqual(buffer.getvalue(), self.reference_wav(b"".join(chunks)))
+
+    def test_reused_buffer_drops_stale_tail(self):
+        buffer = io.BytesIO()
+        write_wav(buffer, [b"\x00\x01" * 1000])
+        write_wav(buffer, [b"\x02\x03" * 10])
+        self.assertEqual(buffer.getvalue(), self.reference_wav(b"\x02\x03" * 10))
+
+    def test_empty_pcm_produces_bare_header(self):
+        buffer = io.BytesIO()
+        write_wav(buffer, [])
+        self.assertEqual(len(buffer.getvalue()), 44)
+
+
+@unittest.skipIf(sf is None, "soundfile is not installed")
+class TestWriteFlac(unittest.TestCase):
+    def test_round_trips_pcm(self):
+        samples = (np.sin(np.arange(16000) / 20.0) * 8000).astype(np.int16)
+        chunks = [samples[:7000].tobytes(), samples[7000:].tobytes()]
+        buffer = io.BytesIO(b"stale contents")
+        write_flac(buffer, chunks)
+        self.assertEqual(buffer.tell(), 0)
+        decoded, samplerate = sf.read(buffer, dtype='int16')
+        self.assertEqual(samplerate, SAMPLERATE)
+        np.testing.assert_array_equal(decoded, samples)
+        # Lossless compression should still beat the raw PCM size on a smooth signal.
+        self.assertLess(len(buffer.getvalue()), samples.nbytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
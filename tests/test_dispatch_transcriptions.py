@@ -0,0 +1,78 @@
+import asyncio
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import main
+
+
+class TestDispatchTranscriptions(unittest.TestCase):
+    def test_printer_keeps_submission_order_when_later_segments_finish_first(self):
+        # The first segment is the slowest and the last one the fastest.
+        delays = {"a.flac": 0.06, "b.flac": 0.03, "c.flac": 0.0}
+        finished = []
+
+        async def fake_transcribe(file_tuple, prompt, language, on_delta=None):
+            await asyncio.sleep(delays[file_tuple[0]])
+            finished.append(file_tuple[0])
+            for piece in ("text ", file_tuple[0][0]):
+                on_delta(piece)
+            return "text " + file_tuple[0][0]
+
+        async def noop():
+            pass
+
+        async def run():
+            segment_queue = asyncio.Queue()
+            for name in delays:
+                segment_queue.put_nowait((name, io.BytesIO(), "audio/flac"))
+            dispatcher = asyncio.create_task(main.dispatch_transcriptions("topic", segment_queue))
+            await asyncio.sleep(0.2)
+            dispatcher.cancel()
+            await asyncio.gather(dispatcher, return_exceptions=True)
+
+        out = io.StringIO()
+        with mock.patch.object(main, "transcribe_audio_async", fake_transcribe), \
+                mock.patch.object(main, "prewarm_connection", noop), redirect_stdout(out):
+            asyncio.run(run())
+        self.assertEqual(finished, ["c.flac", "b.flac", "a.flac"])
+        self.assertEqual(out.getvalue(), "Transcription: text a\nTranscription: text b\nTranscription: text c\n")
+
+    def test_shutdown_cancels_an_inflight_topic_refinement(self):
+        refinement_cancelled = []
+
+        async def fake_transcribe(file_tuple, prompt, language, on_delta=None):
+            return "text"
+
+        async def slow_refinement(*args):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                refinement_cancelled.append(True)
+                raise
+
+        async def noop():
+            pass
+
+        async def run():
+            segment_queue = asyncio.Queue()
+            segment_queue.put_nowait(("a.flac", io.BytesIO(), "audio/flac"))
+            dispatcher = asyncio.create_task(main.dispatch_transcriptions("topic", segment_queue))
+            await asyncio.sleep(0.05)
+            dispatcher.cancel()
+            await asyncio.gather(dispatcher, return_exceptions=True)
+            # Nothing the dispatcher started is left running.
+            self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+        # The first transcript comes in a minute after start-up, so a refinement starts.
+        clock = iter([0.0, 60.0])
+        with mock.patch.object(main, "transcribe_audio_async", fake_transcribe), \
+                mock.patch.object(main, "generate_topic_from_context_async", slow_refinement), \
+                mock.patch.object(main, "prewarm_connection", noop), \
+                mock.patch.object(main.time, "time", lambda: next(clock, 60.0)), redirect_stdout(io.StringIO()):
+            asyncio.run(run())
+        self.assertEqual(refinement_cancelled, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,13 @@
 import asyncio
+import base64
+import io
+import json
 import unittest
-from streaming_transcription import send_audio_chunks
+from contextlib import redirect_stdout
+from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
+from websockets.frames import Close
+from streaming_transcription import (AudioSource, PcmRing, handle_incoming_transcriptions, run_session,
+                                     send_audio_chunks)
 
 
 class FakeWebSocket:
@@ -8,7 +15,7 @@ class FakeWebSocket:
         self.sent_messages = []
         self._messages = asyncio.Queue()
 
-    async def send(self, message):
+    async def send(self, message, text=None):
         self.sent_messages.append(message)
 
     async def __aiter__(self):
@@ -18,11 +25,22 @@ class FakeWebSocket:
                 break
             yield message
 
+    async def recv(self, decode=None):
+        message = await self._messages.get()
+        if message is None:
+            raise ConnectionClosedOK(None, None)
+        if isinstance(message, Close):
+            raise ConnectionClosedError(message, None)
+        if decode is False and isinstance(message, str):
+            return message.encode()
+        return message
+
     def add_incoming_message(self, message):
         self._messages.put_nowait(message)
 
-    def close_incoming(self):
-        self._messages.put_nowait(None)
+    def close_incoming(self, code=None):
+        # A code other than a normal closure makes recv raise ConnectionClosedError.
+        self._messages.put_nowait(Close(code, "") if code else None)
 
 
 class TestIntegrationStreamingTranscription(unittest.TestCase):
@@ -45,6 +63,217 @@ class TestIntegrationStreamingTranscription(unittest.TestCase):
             self.assertGreater(len(self.fake_ws.sent_messages), 0)
         asyncio.run(run_test())
 
+    def test_sent_frame_is_append_message(self):
+        async def run_test():
+            task = asyncio.create_task(send_audio_chunks(self.fake_ws, self.fake_audio_source))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            message = json.loads(self.fake_ws.sent_messages[0])
+            self.assertEqual(message["type"], "input_audio_buffer.append")
+            self.assertEqual(base64.b64decode(message["audio"]), b"fake_audio_data")
+        asyncio.run(run_test())
+
+    def test_chunks_arriving_within_window_are_coalesced(self):
+        async def run_test():
+            task = asyncio.create_task(send_audio_chunks(self.fake_ws, self.fake_audio_source))
+            await asyncio.sleep(0)
+            self.fake_audio_source.put_nowait(b"_late")
+            await asyncio.sleep(0.1)
+            task.cancel()
+            self.assertEqual(len(self.fake_ws.sent_messages), 1)
+            message = json.loads(self.fake_ws.sent_messages[0])
+            self.assertEqual(base64.b64decode(message["audio"]), b"fake_audio_data_late")
+        asyncio.run(run_test())
+
+    def test_queued_chunks_are_coalesced(self):
+        for _ in range(3):
+            self.fake_audio_source.put_nowait(b"more_audio")
+
+        async def run_test():
+            task = asyncio.create_task(send_audio_chunks(self.fake_ws, self.fake_audio_source))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            self.assertEqual(len(self.fake_ws.sent_messages), 1)
+            message = json.loads(self.fake_ws.sent_messages[0])
+            self.assertEqual(base64.b64decode(message["audio"]), b"fake_audio_data" + b"more_audio" * 3)
+        asyncio.run(run_test())
+
+    def test_handle_incoming_transcriptions_prints_completed_turn(self):
+        for message in ({"type": "transcription_session.created"},
+                        {"type": "conversation.item.input_audio_transcription.delta", "delta": "Hel"},
+                        {"type": "unexpected.event"},
+                        {"type": "conversation.item.input_audio_transcription.completed", "transcript": "lo"}):
+            self.fake_ws.add_incoming_message(json.dumps(message))
+        self.fake_ws.close_incoming()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            asyncio.run(handle_incoming_transcriptions(self.fake_ws))
+        self.assertEqual(output.getvalue(), "Final transcription: Hello\n")
+
+    def test_binary_frames_fall_back_to_json_on_error_event(self):
+        session = {"binary": True}
+
+        async def run_test():
+            task = asyncio.create_task(run_session(self.fake_ws, self.fake_audio_source, session=session))
+            await asyncio.sleep(0.1)
+            self.assertEqual(bytes(self.fake_ws.sent_messages[0]), b"fake_audio_data")
+            # The server answers the raw frame with an error instead of accepting it.
+            with self.assertLogs("streaming_transcription", level="WARNING"):
+                self.fake_ws.add_incoming_message(json.dumps(
+                    {"type": "error", "error": {"type": "invalid_request_error", "message": "expected JSON"}}))
+                await asyncio.sleep(0.05)
+            self.fake_audio_source.put_nowait(b"after_error")
+            await asyncio.sleep(0.1)
+            task.cancel()
+            message = json.loads(self.fake_ws.sent_messages[-1])
+            self.assertEqual(base64.b64decode(message["audio"]), b"after_error")
+        with redirect_stdout(io.StringIO()):
+            asyncio.run(run_test())
+        self.assertFalse(session["binary"])
+
+    def test_binary_rejection_by_close_survives_reconnect(self):
+        session = {"binary": True}
+        self.fake_ws.close_incoming(code=1003)
+
+        async def first_session():
+            with self.assertLogs("streaming_transcription", level="WARNING"):
+                await asyncio.wait_for(run_session(self.fake_ws, self.fake_audio_source, session=session),
+                                       timeout=1)
+        asyncio.run(first_session())
+        self.assertFalse(session["binary"])
+
+        # The next connection gets JSON messages from its first frame.
+        reconnected = FakeWebSocket()
+
+        async def second_session():
+            source = asyncio.Queue()
+            source.put_nowait(b"fresh_audio")
+            task = asyncio.create_task(run_session(reconnected, source, session=session))
+            await asyncio.sleep(0.1)
+            task.cancel()
+        asyncio.run(second_session())
+        message = json.loads(reconnected.sent_messages[0])
+        self.assertEqual(base64.b64decode(message["audio"]), b"fresh_audio")
+
+    def test_binary_frames_carry_raw_pcm(self):
+        async def run_test():
+            task = asyncio.create_task(send_audio_chunks(self.fake_ws, self.fake_audio_source, binary=True))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            self.assertEqual(bytes(self.fake_ws.sent_messages[0]), b"fake_audio_data")
+        asyncio.run(run_test())
+
+    def test_stalled_connection_drops_oldest_frames(self):
+        class StalledWebSocket(FakeWebSocket):
+            async def send(self, message, text=None):
+                await asyncio.Event().wait()
+
+        self.fake_ws = StalledWebSocket()
+
+        async def run_test():
+            task = asyncio.create_task(send_audio_chunks(self.fake_ws, self.fake_audio_source,
+                                                         max_backlog_bytes=1))
+            with self.assertLogs("streaming_transcription", level="WARNING"):
+                # Chunks arriving one at a time become separate frames behind the stalled send.
+                for marker in (b"1", b"2", b"3"):
+                    await asyncio.sleep(0.05)
+                    self.fake_audio_source.put_nowait(marker * 100)
+                await asyncio.sleep(0.05)
+            task.cancel()
+        asyncio.run(run_test())
+
+    def test_writer_stops_once_connection_is_closed(self):
+        class ClosedWebSocket(FakeWebSocket):
+            async def send(self, message, text=None):
+                self.sent_messages.append(message)
+                raise ConnectionClosedError(Close(1006, ""), None)
+
+        self.fake_ws = ClosedWebSocket()
+
+        async def run_test():
+            with self.assertLogs("streaming_transcription", level="INFO") as logs:
+                task = asyncio.create_task(send_audio_chunks(self.fake_ws, self.fake_audio_source))
+                for marker in (b"1", b"2", b"3"):
+                    await asyncio.sleep(0.05)
+                    self.fake_audio_source.put_nowait(marker * 100)
+                await asyncio.sleep(0.05)
+                task.cancel()
+            # One attempt and one log line, rather than an error for every queued frame.
+            self.assertEqual(len(self.fake_ws.sent_messages), 1)
+            self.assertEqual(len(logs.records), 1)
+        asyncio.run(run_test())
+
+    def test_run_session_ends_when_connection_closes(self):
+        self.fake_ws.add_incoming_message(json.dumps(
+            {"type": "conversation.item.input_audio_transcription.completed", "transcript": "done"}))
+        self.fake_ws.close_incoming()
+
+        async def run_test():
+            with redirect_stdout(io.StringIO()):
+                # Without the sender being cancelled this would never return.
+                await asyncio.wait_for(run_session(self.fake_ws, self.fake_audio_source), timeout=1)
+        asyncio.run(run_test())
+
+    def test_unhandled_events_are_skipped_without_info_logging(self):
+        self.fake_ws.add_incoming_message(json.dumps({"type": "input_audio_buffer.committed"}))
+        self.fake_ws.add_incoming_message(json.dumps({"type": "error", "error": {"message": "bad"}}))
+        self.fake_ws.close_incoming()
+        # assertLogs lowers the logger to WARNING, so INFO logging is off during the call.
+        with self.assertLogs("streaming_transcription", level="WARNING") as logs:
+            asyncio.run(handle_incoming_transcriptions(self.fake_ws))
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("bad", logs.output[0])
+
+
+class TestAudioSource(unittest.TestCase):
+    def test_fifo_order_and_empty(self):
+        async def run_test():
+            source = AudioSource()
+            getter = asyncio.create_task(source.get())
+            await asyncio.sleep(0)
+            source.put_nowait(b"a")
+            source.put_nowait(b"b")
+            self.assertEqual(await getter, b"a")
+            self.assertEqual(source.qsize(), 1)
+            self.assertEqual(source.get_nowait(), b"b")
+            with self.assertRaises(asyncio.QueueEmpty):
+                source.get_nowait()
+        asyncio.run(run_test())
+
+
+class TestPcmRing(unittest.TestCase):
+    def test_slots_are_reused_in_order(self):
+        ring = PcmRing(slots=3, slot_bytes=4)
+        for value in (b"ab", b"cd"):
+            slot = ring.reserve()
+            slot[:2] = value
+            ring.commit(2)
+        # One slot is held back for the buffer the consumer last took.
+        self.assertIsNone(ring.reserve())
+        self.assertEqual(bytes(ring.get_nowait()), b"ab")
+        slot = ring.reserve()
+        slot[:3] = b"efg"
+        ring.commit(3)
+        self.assertEqual(bytes(ring.get_nowait()), b"cd")
+        self.assertEqual(bytes(ring.get_nowait()), b"efg")
+        with self.assertRaises(asyncio.QueueEmpty):
+            ring.get_nowait()
+
+    def test_sender_drains_ring(self):
+        async def run_test():
+            ring = PcmRing(slots=4, slot_bytes=16)
+            fake_ws = FakeWebSocket()
+            task = asyncio.create_task(send_audio_chunks(fake_ws, ring))
+            await asyncio.sleep(0)
+            slot = ring.reserve()
+            slot[:5] = b"audio"
+            ring.commit(5)
+            await asyncio.sleep(0.1)
+            task.cancel()
+            message = json.loads(fake_ws.sent_messages[0])
+            self.assertEqual(base64.b64decode(message["audio"]), b"audio")
+        asyncio.run(run_test())
+
 
 if __name__ == '__main__':
     unittest.main()
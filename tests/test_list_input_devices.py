@@ -1,6 +1,6 @@
 import unittest
 import sounddevice as sd
-from transcribe_service.audio_capture import list_input_devices
+from transcribe_service.audio_capture import _query_devices, list_input_devices
 
 class TestListInputDevices(unittest.TestCase):
     def test_only_input_devices_returned(self) -> None:
@@ -15,6 +15,7 @@ class TestListInputDevices(unittest.TestCase):
         # Monkey-patch sd.query_devices to return fake_devices.
         original_query_devices = sd.query_devices
         sd.query_devices = lambda: fake_devices
+        _query_devices.cache_clear()
         try:
             result = list_input_devices()
             # Expect only devices with input channels (max_input_channels > 0) to be included.
@@ -27,6 +28,7 @@ class TestListInputDevices(unittest.TestCase):
         finally:
             # Restore the original sd.query_devices function.
             sd.query_devices = original_query_devices
+            _query_devices.cache_clear()
 
 if __name__ == '__main__':
     unittest.main()
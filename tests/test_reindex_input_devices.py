@@ -1,6 +1,6 @@
 import unittest
 import sounddevice as sd
-from transcribe_service.audio_capture import list_input_devices
+from transcribe_service.audio_capture import _query_devices, list_input_devices
 
 class TestReindexInputDevices(unittest.TestCase):
     def test_reindexing_and_default_marking(self) -> None:
@@ -21,6 +21,7 @@ class TestReindexInputDevices(unittest.TestCase):
         # Monkey-patch sd.query_devices to return fake_devices.
         original_query_devices = sd.query_devices
         sd.query_devices = lambda: fake_devices
+        _query_devices.cache_clear()
         
         try:
             devices = list_input_devices()
@@ -45,6 +46,7 @@ class TestReindexInputDevices(unittest.TestCase):
             self.assertEqual(markers, expected_markers)
         finally:
             sd.query_devices = original_query_devices
+            _query_devices.cache_clear()
 
 if __name__ == '__main__':
     unittest.main()
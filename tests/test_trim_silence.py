@@ -0,0 +1,25 @@
+import unittest
+import numpy as np
+from transcribe_service.vad_processing import trim_silence
+
+
+class TestTrimSilence(unittest.TestCase):
+    def test_trims_quiet_head_and_tail(self):
+        samples = np.zeros(100, dtype=np.int16)
+        samples[10] = 500
+        samples[40] = -500
+        samples[20:30] = 50  # quiet samples inside the span are kept
+        self.assertEqual(trim_silence(samples, 300), (10, 41))
+
+    def test_all_silent_returns_empty_span(self):
+        samples = np.full(50, 100, dtype=np.int16)
+        start, end = trim_silence(samples, 300)
+        self.assertEqual(start, end)
+
+    def test_most_negative_sample_counts_as_loud(self):
+        samples = np.array([0, -32768, 0], dtype=np.int16)
+        self.assertEqual(trim_silence(samples, 300), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
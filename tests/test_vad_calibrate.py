@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+from transcribe_service.vad_processing import VoiceActivityDetector
+
+
+class TestCalibrate(unittest.TestCase):
+    def test_calibrate_picks_mode_from_noise_floor(self):
+        sample_rate = 16000
+        rng = np.random.default_rng(0)
+        quiet_room = rng.integers(-50, 50, 16000, dtype=np.int16)
+        vad_detector = VoiceActivityDetector(mode=1, frame_duration_ms=30, silence_threshold=300)
+        self.assertEqual(vad_detector.calibrate(quiet_room, sample_rate), 0)
+        # A quiet room never lowers the configured silence threshold.
+        self.assertEqual(vad_detector.silence_threshold, 300)
+
+        noisy_room = rng.integers(-4000, 4000, 16000, dtype=np.int16)
+        self.assertEqual(vad_detector.calibrate(noisy_room, sample_rate), 3)
+        self.assertEqual(vad_detector.mode, 3)
+        self.assertGreater(vad_detector.silence_threshold, 4000)
+        # The threshold is a peak, like the one quiet_frames checks, so the room noise is skipped.
+        self.assertTrue(vad_detector.quiet_frames(noisy_room, sample_rate).all())
+
+        # Once the room is quiet again the threshold goes back down to the configured one.
+        vad_detector.calibrate(quiet_room, sample_rate)
+        self.assertEqual(vad_detector.silence_threshold, 300)
+
+    def test_calibrate_without_whole_frame_keeps_mode(self):
+        vad_detector = VoiceActivityDetector(mode=2, frame_duration_ms=30)
+        self.assertEqual(vad_detector.calibrate(np.zeros(100, dtype=np.int16), 16000), 2)
+        self.assertEqual(vad_detector.silence_threshold, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
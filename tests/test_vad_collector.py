@@ -1,5 +1,6 @@
 import unittest
-from transcribe_service.vad_processing import vad_collector
+import numpy as np
+from transcribe_service.vad_processing import vad_collector, find_voiced_segments
 
 
 class FakeVAD:
@@ -46,5 +47,21 @@ class TestVadCollector(unittest.TestCase):
         # Check that the expected voiced bytes appear in the first segment.
         self.assertIn(expected_voiced, segments[0])
 
+
+class TestFindVoicedSegments(unittest.TestCase):
+    def test_segments_include_padding_and_close_on_silence(self):
+        # Window of 3 frames: triggers once all three are voiced and closes after three silent frames.
+        flags = np.array([0, 1, 1, 1, 1, 0, 0, 0, 1, 1, 1], dtype=np.uint8)
+        segments, still_open = find_voiced_segments(flags, 3)
+        self.assertEqual(segments.tolist(), [[1, 8], [8, 11]])
+        # The second segment runs to the end without three trailing silent frames.
+        self.assertTrue(still_open)
+
+    def test_zero_padding_never_triggers(self):
+        flags = np.ones(10, dtype=np.uint8)
+        segments, still_open = find_voiced_segments(flags, 0)
+        self.assertEqual(len(segments), 0)
+        self.assertFalse(still_open)
+
 if __name__ == '__main__':
     unittest.main()
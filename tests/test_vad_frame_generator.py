@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from transcribe_service.vad_processing import VoiceActivityDetector
 
 class TestFrameGenerator(unittest.TestCase):
@@ -27,5 +28,23 @@ class TestFrameGenerator(unittest.TestCase):
         for frame in frames:
             self.assertEqual(len(frame), expected_frame_size)
 
+    def test_frame_generator_accepts_int16_array(self):
+        sample_rate = 16000
+        vad_detector = VoiceActivityDetector(mode=1, frame_duration_ms=30)
+        # 2.5 frames worth of samples; the trailing partial frame is dropped.
+        samples = np.arange(1200, dtype=np.int16)
+        frames = list(vad_detector.frame_generator(samples, sample_rate))
+        self.assertEqual(len(frames), 2)
+        # Frames are byte views over the array, not copies.
+        self.assertEqual(frames[0].tobytes(), samples[:480].tobytes())
+        self.assertEqual(frames[1].tobytes(), samples[480:960].tobytes())
+
+    def test_frame_size_per_sample_rate(self):
+        vad_detector = VoiceActivityDetector(mode=1, frame_duration_ms=30)
+        self.assertEqual(vad_detector.frame_size(16000), 960)
+        self.assertEqual(vad_detector.frame_size(8000), 480)
+        # Repeated lookups come from the per-rate cache.
+        self.assertEqual(vad_detector.frame_size(16000), 960)
+
 if __name__ == '__main__':
     unittest.main()
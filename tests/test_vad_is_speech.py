@@ -46,5 +46,30 @@ class TestIsSpeech(unittest.TestCase):
         # Restore the original method.
         vad_detector.vad.is_speech = original_is_speech
 
+    def test_is_speech_stops_once_majority_is_decided(self):
+        sample_rate = 16000
+        vad_detector = VoiceActivityDetector(mode=1, frame_duration_ms=30)
+        audio_data = b'\x00' * 960 * 10
+        calls = []
+        vad_detector.vad.is_speech = lambda frame, rate: calls.append(frame) or True
+        self.assertTrue(vad_detector.is_speech(audio_data, sample_rate))
+        # Six speech frames out of ten already settle it.
+        self.assertEqual(len(calls), 6)
+
+    def test_is_speech_skips_vad_for_quiet_frames(self):
+        import numpy as np
+        sample_rate = 16000
+        vad_detector = VoiceActivityDetector(mode=1, frame_duration_ms=30, silence_threshold=300)
+        samples = np.zeros(480 * 4, dtype=np.int16)
+        samples[:480] = 1000
+        samples[480 * 3] = -32768
+        np.testing.assert_array_equal(vad_detector.quiet_frames(samples, sample_rate),
+                                      [False, True, True, False])
+        calls = []
+        vad_detector.vad.is_speech = lambda frame, rate: calls.append(frame) or True
+        # The two quiet frames settle it as silence without reaching the VAD.
+        self.assertFalse(vad_detector.is_speech(samples, sample_rate))
+        self.assertEqual(len(calls), 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+import numpy as np
+from transcribe_service.vad_processing import VoiceActivityDetector, speech_runs
+
+
+class TestScanAll(unittest.TestCase):
+    def test_scan_all_flags_every_frame(self):
+        sample_rate = 16000
+        vad_detector = VoiceActivityDetector(mode=1, frame_duration_ms=30, silence_threshold=300)
+        # Five frames, the middle one silent, plus a trailing partial frame.
+        samples = np.full(480 * 5 + 100, 1000, dtype=np.int16)
+        samples[480 * 2:480 * 3] = 0
+        calls = []
+        vad_detector.vad.is_speech = lambda frame, rate: calls.append(len(frame)) or True
+        flags = vad_detector.scan_all(samples, sample_rate)
+        np.testing.assert_array_equal(flags, [1, 1, 0, 1, 1])
+        self.assertEqual(flags.dtype, np.uint8)
+        # The quiet frame never reaches the VAD, and every frame passed is a whole one.
+        self.assertEqual(calls, [960] * 4)
+
+    def test_speech_runs(self):
+        flags = np.array([0, 1, 1, 0, 0, 1, 0, 1], dtype=np.uint8)
+        np.testing.assert_array_equal(speech_runs(flags), [[1, 3], [5, 6], [7, 8]])
+        self.assertEqual(speech_runs(np.zeros(0, dtype=np.uint8)).shape, (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import numpy as np
+from transcribe_service.config import SILENCE_TRIM_MARGIN_MS
+from transcribe_service.segmenter import VoiceSegmenter
+from transcribe_service.vad_processing import VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+MARGIN = SAMPLE_RATE * SILENCE_TRIM_MARGIN_MS // 1000
+
+
+def tone(seconds, amplitude):
+    """Alternating +/-amplitude samples, loud from the very first sample."""
+    samples = np.full((int(SAMPLE_RATE * seconds), 1), amplitude, np.int16)
+    samples[1::2] = -amplitude
+    return samples
+
+
+def silence(seconds):
+    return np.zeros((int(SAMPLE_RATE * seconds), 1), np.int16)
+
+
+def make_segmenter(calibration_seconds=0, recalibration_seconds=0):
+    detector = VoiceActivityDetector(mode=1, frame_duration_ms=30, silence_threshold=300)
+    # Any frame with a loud sample counts as speech.
+    detector.vad.is_speech = lambda frame, rate: bool(np.frombuffer(frame, np.int16).max() > 500)
+    return VoiceSegmenter(detector, SAMPLE_RATE, 1, buffer_seconds=4, padding_ms=300,
+                          max_segment_seconds=2, calibration_seconds=calibration_seconds,
+                          recalibration_seconds=recalibration_seconds)
+
+
+def feed(segmenter, audio, block=1440):
+    """Feed audio in capture-sized blocks, as process_audio_segment does."""
+    voiced = []
+    pos = 0
+    while pos < len(audio):
+        n = min(block, len(audio) - pos, segmenter.free())
+        segmenter.receive(n)[:] = audio[pos:pos + n]
+        pos += n
+        voiced.extend(segmenter.segments())
+    return voiced
+
+
+class TestVoiceSegmenter(unittest.TestCase):
+    def test_segments_come_out_in_order_and_trimmed(self):
+        segmenter = make_segmenter()
+        # 4.5 s in total, more than the 4 s buffer, so it has to shift as it goes.
+        audio = np.concatenate([silence(1), tone(0.6, 1000), silence(1), tone(0.9, 2000), silence(1)])
+        voiced = feed(segmenter, audio)
+        self.assertEqual([len(v) for v in voiced], [9600 + 2 * MARGIN, 14400 + 2 * MARGIN])
+        self.assertEqual(int(voiced[0].max()), 1000)
+        self.assertEqual(int(voiced[1].max()), 2000)
+        self.assertLess(segmenter.filled, segmenter.buffer.shape[0])
+
+    def test_backlog_never_exceeds_max_segment_length(self):
+        segmenter = make_segmenter()
+        speech = tone(3.6, 1000)
+        # All of the speech arrives before a single scan, as under backlog.
+        segmenter.receive(len(speech))[:] = speech
+        voiced = segmenter.segments()
+        voiced += feed(segmenter, silence(1))
+        max_samples = segmenter.max_segment_frames * segmenter.samples_per_frame
+        self.assertGreater(len(voiced), 1)
+        for v in voiced:
+            self.assertLessEqual(len(v), max_samples)
+        # Split at frame boundaries with nothing lost or repeated; only the last piece
+        # carries a trailing margin of silence.
+        np.testing.assert_array_equal(np.concatenate(voiced), np.concatenate([speech, silence(MARGIN / SAMPLE_RATE)]))
+
+    def test_speech_just_over_max_segment_length_is_kept(self):
+        for seconds in (2.1, 2.2, 4.1):
+            segmenter = make_segmenter()
+            speech = tone(seconds, 1000)
+            voiced = feed(segmenter, np.concatenate([silence(1), speech, silence(1)]))
+            # The rest after each cut is too short to trigger the VAD on its own.
+            self.assertEqual(len(voiced), int(seconds // 2) + 1)
+            self.assertEqual(sum(int(np.count_nonzero(v)) for v in voiced), len(speech))
+
+    def test_calibrates_once_before_classifying(self):
+        segmenter = make_segmenter(calibration_seconds=0.5)
+        calls = []
+        calibrate = segmenter.detector.calibrate
+        segmenter.detector.calibrate = lambda audio, rate: calls.append(len(audio)) or calibrate(audio, rate)
+        segmenter.receive(4000)[:] = silence(0.25)
+        self.assertEqual(segmenter.segments(), [])
+        self.assertEqual(segmenter.classified, 0)
+        voiced = feed(segmenter, np.concatenate([silence(0.26), tone(0.6, 1000), silence(1)]))
+        self.assertEqual(calls, [8000])
+        self.assertEqual([len(v) for v in voiced], [9600 + 2 * MARGIN])
+
+    def test_recalibrates_on_later_silence(self):
+        segmenter = make_segmenter(calibration_seconds=0.5, recalibration_seconds=1)
+        calls = []
+        calibrate = segmenter.detector.calibrate
+        segmenter.detector.calibrate = lambda audio, rate: calls.append(int(audio.max())) or calibrate(audio, rate)
+        # The room gets noisier after startup; speech alone never triggers a recalibration.
+        noise = np.full((int(SAMPLE_RATE * 1.2), 1), 400, np.int16)
+        voiced = feed(segmenter, np.concatenate([silence(0.5), tone(1.2, 1000), noise]))
+        self.assertEqual(calls, [0, 400])
+        self.assertEqual(len(voiced), 1)
+        self.assertEqual(segmenter.detector.silence_threshold, 600)
+        # The configured threshold comes back once the room is quiet again.
+        feed(segmenter, silence(1.5))
+        self.assertEqual(calls, [0, 400, 0])
+        self.assertEqual(segmenter.detector.silence_threshold, 300)
+
+    def test_soft_onset_survives_trimming(self):
+        segmenter = make_segmenter()
+        # 60 ms below the 300 peak threshold before the loud part, like a soft consonant.
+        onset = np.full((960, 1), 150, np.int16)
+        voiced = feed(segmenter, np.concatenate([silence(1), onset, tone(0.6, 1000), silence(1)]))
+        self.assertEqual(len(voiced), 1)
+        self.assertEqual(int(np.count_nonzero(voiced[0] == 150)), 960)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,39 @@
 """Module for interacting with the OpenAI API for audio transcription and topic generation."""
+import httpx
 import openai
 import internal_logging as logging
 import os
+from transcribe_service.config import (API_MAX_RETRIES, API_TIMEOUT_SECONDS, HTTP_KEEPALIVE_CONNECTIONS,
+                                       HTTP_KEEPALIVE_EXPIRY)
 
 logger = logging.logger
-client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Both clients keep pooled HTTP/2 connections alive between segments so consecutive
+# and concurrent requests reuse one TLS session instead of handshaking again.
+# Transient failures are retried by the SDK itself, with backoff that honours Retry-After.
+_http_limits = httpx.Limits(max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+client = openai.OpenAI(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    max_retries=API_MAX_RETRIES,
+    timeout=API_TIMEOUT_SECONDS,
+    http_client=openai.DefaultHttpxClient(http2=True, limits=_http_limits))
+async_client = openai.AsyncOpenAI(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    max_retries=API_MAX_RETRIES,
+    timeout=API_TIMEOUT_SECONDS,
+    http_client=openai.DefaultAsyncHttpxClient(http2=True, limits=_http_limits))
+
+
+async def prewarm_connection() -> None:
+    """Open a connection to the API ahead of the first transcription.
+
+    Issues a cheap models listing so the TCP and TLS handshakes are off the
+    critical path of the first segment. Failures are logged and otherwise ignored.
+    """
+    try:
+        await async_client.models.list()
+    except Exception as e:
+        logger.warning("Could not prewarm API connection: %s", e)
 
 
 def transcribe_audio(file_tuple, prompt: str, language: str) -> str:
@@ -15,30 +44,73 @@ def transcribe_audio(file_tuple, prompt: str, language: str) -> str:
         prompt (str): The transcription prompt.
         language (str): The language code for transcription.
 
+    Returns:
+        str: The transcription text, or an empty string if the request failed.
+    """
+    try:
+        response = client.audio.transcriptions.create(
+            file=file_tuple,
+            model="gpt-4o-transcribe",
+            language=language,
+            prompt=prompt,
+            temperature=0
+        )
+        return response.text
+    except Exception as e:
+        logger.error("Transcription API failed: %s", e)
+        return ""
+
+
+async def transcribe_audio_async(file_tuple, prompt: str, language: str, on_delta=None) -> str:
+    """Transcribe audio using the async OpenAI client, streaming the response.
+
+    Behaves like transcribe_audio but awaits the request, so several transcriptions
+    can be in flight on one event loop. Text is streamed back as it is recognised and
+    passed to on_delta piece by piece. The SDK only retries before the stream starts,
+    so on_delta never sees repeats; if the stream breaks, the text received so far
+    is returned.
+
+    Parameters:
+        file_tuple: tuple containing (filename, file object, mimetype)
+        prompt (str): The transcription prompt.
+        language (str): The language code for transcription.
+        on_delta (callable): Optional callback receiving each streamed text delta.
+
     Returns:
         str: The transcription text.
     """
-    import time
-    max_attempts = 3
-    delay = 1
-    attempt = 0
-    while attempt < max_attempts:
-        try:
-            response = client.audio.transcriptions.create(
-                file=file_tuple,
-                model="gpt-4o-transcribe",
-                language=language,
-                prompt=prompt,
-                temperature=0
-            )
-            return response.text
-        except Exception as e:
-            logger.error("Error calling transcription API (attempt %d): %s", attempt + 1, e)
-            attempt += 1
-            time.sleep(delay)
-            delay *= 2
-    logger.error("Transcription API failed after %d attempts", max_attempts)
-    return ""
+    deltas = []
+    try:
+        stream = await async_client.audio.transcriptions.create(
+            file=file_tuple,
+            model="gpt-4o-transcribe",
+            language=language,
+            prompt=prompt,
+            temperature=0,
+            stream=True
+        )
+        async for event in stream:
+            if event.type == "transcript.text.delta":
+                deltas.append(event.delta)
+                if on_delta is not None:
+                    on_delta(event.delta)
+            elif event.type == "transcript.text.done":
+                return event.text
+    except Exception as e:
+        if deltas:
+            logger.error("Transcription stream interrupted: %s", e)
+        else:
+            logger.error("Transcription API failed: %s", e)
+    return "".join(deltas)
+
+
+def _topic_prompt(full_transcript: str, initial_topic: str, previous_topic: str) -> str:
+    """Build the completion prompt used to refine the topic."""
+    return (
+        f"Based on the following conversation transcript:\n{full_transcript}\n"
+        f"The user initially indicated the topic as '{initial_topic}', and the previous refined topic was '{previous_topic}'.\n"
+        "Please generate a refined, concise topic that best represents the ongoing conversation:"
+    )
 
 
 def generate_topic_from_context(full_transcript: str, initial_topic: str,
@@ -52,32 +124,47 @@ def generate_topic_from_context(full_transcript: str, initial_topic: str,
         language (str): The language code for topic generation.
 
     Returns:
-        str: A refined topic.
+        str: A refined topic, or previous_topic if the request failed.
     """
-    import time
-    prompt = (
-        f"Based on the following conversation transcript:\n{full_transcript}\n"
-        f"The user initially indicated the topic as '{initial_topic}', and the previous refined topic was '{previous_topic}'.\n"
-        "Please generate a refined, concise topic that best represents the ongoing conversation:"
-    )
-    max_attempts = 3
-    delay = 1
-    attempt = 0
-    while attempt < max_attempts:
-        try:
-            response = client.completions.create(
-                model="gpt-4",
-                prompt=prompt,
-                max_tokens=30,
-                temperature=0.5,
-                language=language
-            )
-            new_topic = response.choices[0].text.strip()
-            return new_topic
-        except Exception as e:
-            logger.error("Error generating topic from context (attempt %d): %s", attempt + 1, e)
-            attempt += 1
-            time.sleep(delay)
-            delay *= 2
-    logger.error("Topic generation failed after %d attempts", max_attempts)
-    return previous_topic
+    try:
+        response = client.completions.create(
+            model="gpt-4",
+            prompt=_topic_prompt(full_transcript, initial_topic, previous_topic),
+            max_tokens=30,
+            temperature=0.5,
+            language=language
+        )
+        new_topic = response.choices[0].text.strip()
+        return new_topic
+    except Exception as e:
+        logger.error("Topic generation failed: %s", e)
+        return previous_topic
+
+
+async def generate_topic_from_context_async(full_transcript: str, initial_topic: str,
+                                            previous_topic: str, language: str) -> str:
+    """Generate a refined topic like generate_topic_from_context, using the async client.
+
+    The request runs on the caller's event loop instead of blocking a thread.
+
+    Parameters:
+        full_transcript (str): The full conversation transcript.
+        initial_topic (str): The initial topic provided by the user.
+        previous_topic (str): The previous refined topic.
+        language (str): The language code for topic generation.
+
+    Returns:
+        str: A refined topic, or previous_topic if the request failed.
+    """
+    try:
+        response = await async_client.completions.create(
+            model="gpt-4",
+            prompt=_topic_prompt(full_transcript, initial_topic, previous_topic),
+            max_tokens=30,
+            temperature=0.5,
+            language=language
+        )
+        return response.choices[0].text.strip()
+    except Exception as e:
+        logger.error("Topic generation failed: %s", e)
+        return previous_topic
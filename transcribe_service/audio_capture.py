@@ -1,33 +1,203 @@
 """Module for capturing audio from input devices and enqueuing audio data for transcription."""
+import errno
+import functools
+import operator
+import os
+import transcribe_service.portaudio_env  # noqa: F401  (must run before sounddevice is imported)
 import sounddevice as sd
 import numpy as np
+import threading
 import time
-import queue
 import internal_logging as logging
+from transcribe_service.config import (AUDIO_RING_SEGMENTS, AUDIO_THREAD_PRIORITY, CAPTURE_NOTIFY_MS, CHANNELS,
+                                       SAMPLERATE, SEGMENT_SECONDS)
 
 logger = logging.logger
-audio_queue = queue.Queue()
+
+
+class AudioRing:
+    """A preallocated single-producer/single-consumer ring buffer of int16 audio frames.
+
+    The PortAudio callback is the only writer and the transcription worker the only
+    reader; each side only ever advances its own counter, so no lock is needed.
+    """
+
+    DROP_LOG_INTERVAL = 1.0
+
+    def __init__(self, capacity_frames: int, channels: int, notify_frames: int) -> None:
+        """Initialize the ring buffer.
+
+        Parameters:
+            capacity_frames (int): Number of frames the ring can hold.
+            channels (int): Number of channels per frame.
+            notify_frames (int): Set data_ready each time this many frames have been written.
+        """
+        self.buf = np.empty((capacity_frames, channels), np.int16)
+        self.capacity = capacity_frames
+        self.notify_frames = notify_frames
+        self.data_ready = threading.Event()
+        # Monotonic frame counters; positions in buf are taken modulo capacity.
+        self.w = 0
+        self.r = 0
+        self._next_notify = notify_frames
+        self.dropped = 0
+        # Overrun warnings are throttled to one per DROP_LOG_INTERVAL seconds.
+        self._unlogged_drops = 0
+        self._last_drop_log = float('-inf')
+        # Optional no-argument callable run by the writer after every write, e.g. to wake
+        # an event loop with call_soon_threadsafe. It must not block.
+        self.on_data = None
+
+    def write(self, frames: np.ndarray) -> None:
+        """Copy frames into the ring without allocating.
+
+        A block longer than the ring keeps only its newest capacity frames; the
+        rest are skipped as if overwritten and count as dropped.
+        """
+        n = frames.shape[0]
+        if n > self.capacity:
+            self.w += n - self.capacity
+            frames = frames[-self.capacity:]
+            n = self.capacity
+        start = self.w % self.capacity
+        first = min(n, self.capacity - start)
+        np.copyto(self.buf[start:start + first], frames[:first])
+        if first < n:
+            np.copyto(self.buf[:n - first], frames[first:])
+        self.w += n
+        if self.w >= self._next_notify:
+            self._next_notify = self.w + self.notify_frames
+            self.data_ready.set()
+        on_data = self.on_data
+        if on_data is not None:
+            on_data()
+
+    def available(self) -> int:
+        """Return the number of frames written but not yet read.
+
+        If the writer has lapped the reader, the overwritten (oldest) frames are
+        skipped so the reader resumes at the oldest frame still intact; latency
+        and memory stay bounded when the consumer falls behind. Only the reader
+        may call this.
+        """
+        overrun = self.w - self.r - self.capacity
+        if overrun > 0:
+            self.r += overrun
+            self.dropped += overrun
+            self._unlogged_drops += overrun
+            now = time.monotonic()
+            if now - self._last_drop_log >= self.DROP_LOG_INTERVAL:
+                logger.warning("Audio capture overrun, dropped %d oldest frames (%d total).",
+                               self._unlogged_drops, self.dropped)
+                self._unlogged_drops = 0
+                self._last_drop_log = now
+        return self.w - self.r
+
+    def skip_to_latest(self, keep_frames: int) -> int:
+        """Discard all but the newest keep_frames unread frames. Only the reader may call this.
+
+        Unread frames the writer has already overwritten are skipped along with the
+        rest, without counting as an overrun, since the reader chose not to read them.
+
+        Parameters:
+            keep_frames (int): Number of the most recent frames to leave readable.
+
+        Returns:
+            int: The number of frames discarded.
+        """
+        stale = self.w - self.r - min(keep_frames, self.capacity)
+        if stale <= 0:
+            return 0
+        self.r += stale
+        return stale
+
+    def read_into(self, out: np.ndarray) -> None:
+        """Copy the next out.shape[0] frames into out and advance the read position."""
+        n = out.shape[0]
+        start = self.r % self.capacity
+        first = min(n, self.capacity - start)
+        np.copyto(out[:first], self.buf[start:start + first])
+        if first < n:
+            np.copyto(out[first:], self.buf[:n - first])
+        self.r += n
+
+
+audio_ring = AudioRing(SAMPLERATE * SEGMENT_SECONDS * AUDIO_RING_SEGMENTS, CHANNELS,
+                       notify_frames=SAMPLERATE * CAPTURE_NOTIFY_MS // 1000)
+
+
+# Last non-empty PortAudio status flags, set by the callback and logged by start_audio_capture.
+# A single item assignment is atomic, so the callback never takes a lock or does I/O.
+stream_status = [None]
+
+
+# Bound once so the realtime callback skips the attribute lookup on every block.
+_write_to_ring = audio_ring.write
 
 
 def enque_audio(indata: np.ndarray, frames: int, time_info: dict, status: object) -> None:
-    """Enqueue a copy of the incoming audio data into the global audio_queue."""
+    """Copy the incoming audio data into the global audio_ring."""
     if status:
-        logger.debug("Streaming status: %s", status)
-    # Simply enqueue the raw audio data (as a copy to avoid conflicts)
-    audio_queue.put(indata.copy())
+        stream_status[0] = status
+    _write_to_ring(indata)
+
 
+def raise_thread_priority(native_id: int, priority: int = AUDIO_THREAD_PRIORITY) -> bool:
+    """Move a thread to the SCHED_FIFO real-time scheduling class, if enabled.
 
-def list_input_devices():
-    """Return a list of input devices that have available input channels."""
-    devices = sd.query_devices()
-    all_input_devices = [(i, d) for i, d in enumerate(devices) if d['max_input_channels'] > 0]
-    return all_input_devices
+    This is opt-in through AUDIO_THREAD_PRIORITY. It needs CAP_SYS_NICE (e.g.
+    `setcap cap_sys_nice+ep` on the Python binary) or root, and is only available on
+    Linux; otherwise the thread keeps its normal priority.
+
+    Parameters:
+        native_id (int): The thread's native id (threading.Thread.native_id).
+        priority (int): The SCHED_FIFO priority (1-99); 0 or None leaves the thread alone.
+
+    Returns:
+        bool: True if the scheduling policy was changed.
+    """
+    if not priority:
+        return False
+    try:
+        os.sched_setscheduler(native_id, os.SCHED_FIFO, os.sched_param(priority))
+    except AttributeError:
+        logger.debug("Real-time thread priority is not supported on this platform.")
+        return False
+    except OSError as e:
+        # Missing CAP_SYS_NICE is the common case and not worth a warning.
+        log = logger.debug if e.errno == errno.EPERM else logger.warning
+        log("Could not raise priority of thread %d: %s", native_id, e)
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=1)
+def _query_devices() -> tuple:
+    """Enumerate PortAudio devices once and keep the (index, device) pairs that have inputs.
+
+    list_input_devices(refresh=True) clears the cache to re-enumerate.
+    """
+    input_channels = operator.itemgetter('max_input_channels')
+    return tuple((i, d) for i, d in enumerate(sd.query_devices()) if input_channels(d) > 0)
+
+
+def list_input_devices(refresh: bool = False):
+    """Return a list of input devices that have available input channels.
+
+    Parameters:
+        refresh (bool): Re-enumerate devices instead of reusing the cached list, e.g. after
+            a device was plugged in.
+    """
+    if refresh:
+        _query_devices.cache_clear()
+    # A fresh list each call, so callers cannot modify the cached devices.
+    return list(_query_devices())
 
 
 def start_audio_capture(device_name: str, channels: int, samplerate: int):
     """Start capturing audio from the specified device.
 
-    This function opens an InputStream using the given device, channels, and sample rate,
+    This function opens an int16 InputStream using the given device, channels, and sample rate,
     and continuously enqueues audio data until interrupted.
     """
     try:
@@ -35,11 +205,16 @@ def start_audio_capture(device_name: str, channels: int, samplerate: int):
             device=device_name,
             channels=channels,
             samplerate=samplerate,
+            dtype='int16',
+            latency='low',
             callback=enque_audio
         ):
             print("Collecting audio for transcription. Press Ctrl+C to exit...")
             while True:
                 time.sleep(1)
+                status, stream_status[0] = stream_status[0], None
+                if status:
+                    logger.debug("Streaming status: %s", status)
     except KeyboardInterrupt:
         print("Exiting...")
     except Exception as e:
@@ -0,0 +1,87 @@
+"""Module for packaging captured PCM audio for upload to the transcription API."""
+import io
+import struct
+from typing import Sequence
+import internal_logging as logging
+from transcribe_service.config import CHANNELS, SAMPLERATE, UPLOAD_FORMAT
+
+try:
+    import soundfile as sf
+except ImportError:  # FLAC uploads need soundfile; fall back to WAV without it.
+    sf = None
+
+logger = logging.logger
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+# Everything in the 44-byte RIFF header between the RIFF size and the data size is
+# fixed for a given format, so it is built once at import.
+_WAV_HEADER_MIDDLE = b"WAVEfmt " + struct.pack(
+    "<IHHIIHH",
+    16,                                   # fmt chunk size
+    1,                                    # PCM
+    CHANNELS,
+    SAMPLERATE,
+    SAMPLERATE * CHANNELS * SAMPLE_WIDTH,  # byte rate
+    CHANNELS * SAMPLE_WIDTH,               # block align
+    SAMPLE_WIDTH * 8,                      # bits per sample
+) + b"data"
+
+
+def write_wav(buffer: io.BytesIO, pcm_chunks: Sequence[bytes]) -> None:
+    """Write raw 16-bit PCM chunks into buffer as a WAV file.
+
+    The buffer is overwritten from the start rather than recreated, so a pooled
+    BytesIO keeps its allocation across segments. It is left positioned at 0.
+
+    Parameters:
+        buffer (io.BytesIO): The buffer to overwrite.
+        pcm_chunks (Sequence[bytes]): Raw PCM audio data (16-bit little-endian, CHANNELS, SAMPLERATE).
+    """
+    data_size = sum(len(chunk) for chunk in pcm_chunks)
+    buffer.seek(0)
+    buffer.write(b"RIFF")
+    buffer.write(struct.pack("<I", 36 + data_size))
+    buffer.write(_WAV_HEADER_MIDDLE)
+    buffer.write(struct.pack("<I", data_size))
+    for chunk in pcm_chunks:
+        buffer.write(chunk)
+    buffer.truncate()
+    buffer.seek(0)
+
+
+def write_flac(buffer: io.BytesIO, pcm_chunks: Sequence[bytes]) -> None:
+    """Encode raw 16-bit PCM chunks into buffer as a FLAC file.
+
+    libsndfile rewrites the stream header on close and leaves the position there,
+    so the buffer is emptied first instead of being overwritten in place. It is
+    left positioned at 0.
+
+    Parameters:
+        buffer (io.BytesIO): The buffer to overwrite.
+        pcm_chunks (Sequence[bytes]): Raw PCM audio data (16-bit little-endian, CHANNELS, SAMPLERATE).
+    """
+    buffer.seek(0)
+    buffer.truncate(0)
+    with sf.SoundFile(buffer, 'w', samplerate=SAMPLERATE, channels=CHANNELS,
+                      format='FLAC', subtype='PCM_16') as f:
+        for chunk in pcm_chunks:
+            f.buffer_write(chunk, dtype='int16')
+    buffer.seek(0)
+
+
+def encode_segment(buffer: io.BytesIO, pcm_chunks: Sequence[bytes]) -> tuple:
+    """Encode raw 16-bit PCM chunks for upload in the configured UPLOAD_FORMAT.
+
+    Parameters:
+        buffer (io.BytesIO): The buffer to write the encoded file into.
+        pcm_chunks (Sequence[bytes]): Raw PCM audio data (16-bit little-endian, CHANNELS, SAMPLERATE).
+
+    Returns:
+        tuple: A (filename, file object, mimetype) tuple for the transcription API.
+    """
+    if UPLOAD_FORMAT == "flac" and sf is not None:
+        write_flac(buffer, pcm_chunks)
+        return ("audio.flac", buffer, "audio/flac")
+    write_wav(buffer, pcm_chunks)
+    return ("audio.wav", buffer, "audio/wav")
@@ -11,7 +11,26 @@ LANGUAGE_CODE = "en" if cur_locale[0] is None else cur_locale[0].split("_")[0].l
 DEVICE_NAME = "Aggregate Device"
 CHANNELS = 1
 SAMPLERATE = 16000
-SEGMENT_SECONDS = 5  # Collect 5 seconds of audio for each transcription
+SEGMENT_SECONDS = 5  # Capture ring sizing unit, in seconds
+AUDIO_RING_SEGMENTS = 4  # Capacity of the capture ring buffer, in segments
+CAPTURE_NOTIFY_MS = 90  # Wake the batch worker each time this much audio is captured
+MAX_SEGMENT_SECONDS = 2  # Dispatch a voiced segment once it reaches this length
+VAD_PADDING_MS = 300  # Sliding VAD window used to open and close voiced segments
+VAD_BUFFER_SECONDS = 4  # Rolling buffer of not yet dispatched audio in batch mode
+VAD_CALIBRATION_SECONDS = 1  # Audio sampled at startup to pick the VAD mode and silence threshold
+VAD_RECALIBRATION_SECONDS = 30  # Recalibrate on the next stretch of silence after this much audio; 0 disables
+AUDIO_THREAD_PRIORITY = 0  # SCHED_FIFO priority for the audio worker threads (Linux); 0 leaves them alone
+PA_MIN_LATENCY_MSEC = 5  # Lower bound PortAudio may pick for stream latency
+MAX_INFLIGHT_TRANSCRIPTIONS = 4  # Concurrent transcription requests in batch mode
+PIPELINE_QUEUE_SIZE = 2  # Voiced segments buffered between the VAD and encoding stages
+HTTP_KEEPALIVE_CONNECTIONS = 8  # Idle API connections kept open for reuse
+HTTP_KEEPALIVE_EXPIRY = 300  # Seconds an idle API connection is kept open
+API_MAX_RETRIES = 3  # Retries the OpenAI SDK makes on connection errors, 408/409/429 and 5xx
+API_TIMEOUT_SECONDS = 30.0  # Per-request timeout for OpenAI API calls
+UPLOAD_FORMAT = "flac"  # "flac" (needs soundfile) or "wav" for batch uploads
+SILENCE_PEAK_THRESHOLD = 300  # Int16 amplitude below which audio counts as silence (VAD skip, trimming)
+SILENCE_RMS_THRESHOLD = 200  # Int16 RMS below which a batch segment is skipped before VAD
+SILENCE_TRIM_MARGIN_MS = 90  # Audio kept on each side of the loud span when trimming a voiced segment
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 STREAMING_MODEL = "gpt-4o-transcribe"
 INPUT_AUDIO_FORMAT = "pcm16"
@@ -19,3 +38,7 @@ STREAMING_PROMPT = ""
 STREAMING_THRESHOLD = 0.5
 STREAMING_PREFIX_PADDING_MS = 300
 STREAMING_SILENCE_DURATION_MS = 500
+STREAMING_PCM_SLOTS = 8  # Preallocated PCM buffers between the capture ring and the streaming sender
+STREAMING_BINARY_AUDIO = False  # Send raw PCM binary frames instead of base64 JSON; falls back if rejected
+STREAMING_MAX_BACKLOG_BYTES = 256 * 1024  # Unsent streaming frames beyond this are dropped, oldest first
+STREAMING_COALESCE_MS = 20  # How long the streaming sender waits to merge more audio into one frame
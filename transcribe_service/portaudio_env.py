@@ -0,0 +1,6 @@
+"""Module that sets PortAudio environment options; import it before sounddevice."""
+import os
+from transcribe_service.config import PA_MIN_LATENCY_MSEC
+
+# PortAudio reads this when it initializes, which happens on import of sounddevice.
+os.environ.setdefault("PA_MIN_LATENCY_MSEC", str(PA_MIN_LATENCY_MSEC))
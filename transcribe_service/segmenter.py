@@ -0,0 +1,199 @@
+"""Module for cutting captured audio into voiced segments on VAD endpoints."""
+import numpy as np
+from typing import List
+from transcribe_service.config import SILENCE_RMS_THRESHOLD, SILENCE_TRIM_MARGIN_MS
+from transcribe_service.vad_processing import VoiceActivityDetector, find_voiced_segments, trim_silence
+
+
+def is_below_noise_floor(samples: np.ndarray, peak_threshold: int) -> bool:
+    """Return True if int16 audio is too quiet to be worth running the VAD on.
+
+    The peak check is a plain SIMD min/max reduction, so it runs before the
+    slightly more expensive RMS check.
+
+    Parameters:
+        samples (np.ndarray): Non-empty int16 audio samples.
+        peak_threshold (int): Int16 peak below which the audio counts as silence.
+
+    Returns:
+        bool: True if the peak or the RMS is below its silence threshold.
+    """
+    if samples.max() < peak_threshold and samples.min() > -peak_threshold:
+        return True
+    return np.sqrt(np.mean(np.square(samples, dtype=np.float32))) < SILENCE_RMS_THRESHOLD
+
+
+class VoiceSegmenter:
+    """A rolling buffer of captured audio that yields voiced segments as the VAD closes them.
+
+    Audio is appended with receive(), and segments() classifies the new whole frames,
+    runs the padded VAD state machine over everything not yet dispatched, and returns
+    the finished segments. A segment still open once it reaches max_segment_seconds
+    is dispatched in pieces of that length, and the rest stays open across calls
+    until the VAD closes it. The cap counts VAD frames only: the pre-roll margin
+    _take keeps before a segment's first loud sample can make a piece up to
+    SILENCE_TRIM_MARGIN_MS longer.
+
+    With recalibration enabled, the last calibration_seconds of audio are kept while
+    nothing is voiced, and the detector is calibrated on them again once that much
+    silence follows recalibration_seconds of audio, so the silence threshold follows
+    the room's noise floor up and back down.
+    """
+
+    def __init__(self, detector: VoiceActivityDetector, sample_rate: int, channels: int,
+                 buffer_seconds: float, padding_ms: int, max_segment_seconds: float,
+                 calibration_seconds: float = 0, recalibration_seconds: float = 0) -> None:
+        """Initialize the segmenter and its preallocated buffers.
+
+        Parameters:
+            detector (VoiceActivityDetector): The detector used to classify frames.
+            sample_rate (int): The audio sample rate.
+            channels (int): Number of channels per captured frame.
+            buffer_seconds (float): Capacity of the rolling buffer; must exceed max_segment_seconds.
+            padding_ms (int): Sliding VAD window used to open and close voiced segments.
+            max_segment_seconds (float): Longest segment to dispatch.
+            calibration_seconds (float): Audio to collect and calibrate the detector on
+                before the first classification; 0 skips calibration.
+            recalibration_seconds (float): Least audio between calibrations on later
+                stretches of silence; 0, or no calibration_seconds, calibrates only once.
+        """
+        self.detector = detector
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.samples_per_frame = detector.frame_size(sample_rate) // 2  # 16-bit samples
+        self.num_padding_frames = int(padding_ms / detector.frame_duration_ms)
+        self.max_segment_frames = int(max_segment_seconds * 1000 / detector.frame_duration_ms)
+        self.trim_margin = int(sample_rate * SILENCE_TRIM_MARGIN_MS / 1000)  # in captured frames
+        self.margin_frames = -(-SILENCE_TRIM_MARGIN_MS // detector.frame_duration_ms)  # in VAD frames
+        self.buffer = np.empty((int(sample_rate * buffer_seconds), channels), np.int16)
+        self.speech_flags = np.zeros(self.buffer.shape[0] // self.samples_per_frame, np.uint8)
+        self.filled = 0  # captured frames held in buffer
+        self.classified = 0  # VAD frames at the start of buffer already in speech_flags
+        self.continuing = False  # buffer starts with the rest of a segment cut at max_segment_frames
+        self.calibration_samples = min(int(sample_rate * calibration_seconds), self.buffer.shape[0])
+        self.calibrated = not self.calibration_samples
+        self.calibration_frames = self.calibration_samples // self.samples_per_frame
+        self.recalibration_frames = int(recalibration_seconds * 1000 / detector.frame_duration_ms)
+        if not self.calibration_frames:
+            self.recalibration_frames = 0
+        self.since_calibration = 0  # VAD frames classified since the detector was last calibrated
+
+    def free(self) -> int:
+        """Return how many more captured frames the buffer can take."""
+        return self.buffer.shape[0] - self.filled
+
+    def receive(self, n: int) -> np.ndarray:
+        """Reserve the next n frames of the buffer for new audio.
+
+        Parameters:
+            n (int): Number of frames to add; at most free().
+
+        Returns:
+            np.ndarray: The (n, channels) slice to fill before the next call to segments().
+        """
+        start = self.filled
+        self.filled += n
+        return self.buffer[start:self.filled]
+
+    def segments(self) -> List[np.ndarray]:
+        """Classify newly received audio and take out every segment that is ready.
+
+        Returns:
+            List[np.ndarray]: Voiced int16 segments in capture order, trimmed of silent
+            head and tail samples and copied out of the rolling buffer.
+        """
+        spf = self.samples_per_frame
+        if not self.calibrated:
+            if self.filled < self.calibration_samples:
+                return []
+            self.detector.calibrate(self.buffer[:self.calibration_samples], self.sample_rate)
+            self.calibrated = True
+
+        complete = self.filled // spf
+        if complete > self.classified:
+            new_audio = self.buffer[self.classified * spf:complete * spf]
+            # Cheap first stage: quiet audio never reaches the per-frame VAD.
+            if is_below_noise_floor(new_audio, self.detector.silence_threshold):
+                self.speech_flags[self.classified:complete] = 0
+            else:
+                # Quiet frames inside an otherwise loud batch still skip the VAD one by one.
+                self.speech_flags[self.classified:complete] = self.detector.scan_all(new_audio, self.sample_rate)
+            self.since_calibration += complete - self.classified
+        classified = self.classified = complete
+        if not classified:
+            # Nothing to run the VAD state machine over, e.g. right after a cut.
+            return []
+
+        if (self.recalibration_frames and self.since_calibration >= self.recalibration_frames
+                and classified >= self.calibration_frames and not self.speech_flags[:classified].any()):
+            # Everything held is silence, and the newest calibration window of it is
+            # a fresh sample of the noise floor.
+            window = self.buffer[(classified - self.calibration_frames) * spf:classified * spf]
+            self.detector.calibrate(window, self.sample_rate)
+            self.since_calibration = 0
+
+        found, still_open = find_voiced_segments(self.speech_flags[:classified], self.num_padding_frames,
+                                                 self.continuing)
+        closed = len(found) - 1 if still_open else len(found)
+        voiced = []
+        consumed = 0  # frames before this are dispatched, or too old to matter, and can be dropped
+        for start, end in found[:closed]:
+            # Under backlog a closed segment can span more than one cap's worth of frames.
+            for piece in range(start, end, self.max_segment_frames):
+                self._take(voiced, piece, min(piece + self.max_segment_frames, end),
+                           consumed if piece == start else piece)
+            consumed = end
+        if still_open:
+            start, end = found[-1]
+            # Only a segment open from the very first frame can be the one cut before.
+            continuing = self.continuing and start == 0
+            lower = consumed
+            while end - start >= self.max_segment_frames:
+                self._take(voiced, start, start + self.max_segment_frames, lower)
+                start += self.max_segment_frames
+                lower = start
+                continuing = True
+            # Keep the rest of the open segment. After a cut it starts the buffer and the
+            # VAD state machine resumes there triggered, since the rest may be too short
+            # to trigger again. Otherwise the pre-roll is kept too, and re-running the
+            # state machine from the buffer start reproduces the trigger point.
+            consumed = start if continuing else max(lower, start - self.margin_frames)
+            self.continuing = continuing
+        else:
+            self.continuing = False
+            # Only the last padding window can still contribute to a future trigger, and
+            # the few frames before it are kept as pre-roll for the next segment. With
+            # recalibration on, a whole calibration window of silence is kept as well.
+            keep = self.num_padding_frames - 1 + self.margin_frames
+            if self.recalibration_frames:
+                keep = max(keep, self.calibration_frames)
+            consumed = max(consumed, classified - keep)
+        consumed = min(consumed, classified)
+
+        if consumed:
+            dropped = consumed * spf
+            self.buffer[:self.filled - dropped] = self.buffer[dropped:self.filled]
+            self.speech_flags[:classified - consumed] = self.speech_flags[consumed:classified]
+            self.filled -= dropped
+            self.classified -= consumed
+        return voiced
+
+    def _take(self, voiced: List[np.ndarray], start: int, end: int, lower: int) -> None:
+        """Append frames [start, end) to voiced, minus their silent head and tail.
+
+        SILENCE_TRIM_MARGIN_MS of audio is kept before the first and after the last
+        loud sample, so soft onsets and trailing fricatives below the silence threshold
+        survive the trim. The leading margin may reach back into the pre-roll before
+        start, but never before frame lower, where the previous segment ended.
+        """
+        spf = self.samples_per_frame
+        channels = self.channels
+        segment = self.buffer[start * spf:end * spf]
+        # Frame-level VAD padding rounds out to whole frames; trim the silent head
+        # and tail down to the margin around the loud span.
+        head, tail = trim_silence(segment.ravel(), self.detector.silence_threshold)
+        if head < tail:
+            first = max(start * spf + head // channels - self.trim_margin, lower * spf)
+            last = min(start * spf - (-tail // channels) + self.trim_margin, end * spf)
+            # Copied out because the rolling buffer is shifted once it is consumed.
+            voiced.append(self.buffer[first:last].copy())
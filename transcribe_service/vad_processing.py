@@ -1,70 +1,287 @@
 """Module for voice activity detection processing using WebRTC VAD."""
 import webrtcvad
-import collections
-from typing import Generator, Iterable
+import numpy as np
+from logging import DEBUG
+from typing import Generator, Iterable, Tuple
 import internal_logging as logging
 
+try:
+    from numba import njit
+except ImportError:  # Without numba the helpers below run as plain Python.
+    def njit(*args, **kwargs):
+        return lambda func: func
+
 logger = logging.logger
 
+# (noise floor upper bound, VAD mode) pairs for calibrate(), in int16 peak amplitude;
+# noisier rooms get a more aggressive mode, and anything above the last bound gets mode 3.
+_CALIBRATION_MODES = ((300, 0), (1200, 1), (3600, 2))
+
 
 class VoiceActivityDetector:
     """A class for detecting voice activity in audio using WebRTC VAD."""
 
-    def __init__(self, mode: int = 1, frame_duration_ms: int = 30) -> None:
+    def __init__(self, mode: int = 1, frame_duration_ms: int = 30, silence_threshold: int = 0) -> None:
         """Initialize the VoiceActivityDetector with a VAD mode and frame duration.
 
         Parameters:
             mode (int): Aggressiveness mode between 0 and 3.
             frame_duration_ms (int): Duration of each audio frame in milliseconds.
+            silence_threshold (int): Int16 peak below which a frame counts as silence
+                without running the VAD on it; 0 disables the check.
         """
         self.vad = webrtcvad.Vad()
         self.vad.set_mode(mode)
+        self.mode = mode
         self.frame_duration_ms = frame_duration_ms
+        self.silence_threshold = silence_threshold
+        # calibrate() never sets silence_threshold below the configured value.
+        self._base_silence_threshold = silence_threshold
+        # Frame size in bytes for each sample rate seen so far.
+        self._frame_bytes = {}
 
-    def frame_generator(self, audio: bytes, sample_rate: int) -> Generator[bytes, None, None]:
-        """Generate audio frames of fixed size from raw audio bytes.
+    def frame_size(self, sample_rate: int) -> int:
+        """Return the size in bytes of one 16-bit mono frame at sample_rate.
 
         Parameters:
-            audio (bytes): The raw audio data.
+            sample_rate (int): The audio sample rate.
+
+        Returns:
+            int: Bytes per frame, e.g. 960 for 30 ms at 16 kHz.
+        """
+        size = self._frame_bytes.get(sample_rate)
+        if size is None:
+            bytes_per_sample = 2
+            num_samples_per_frame = int(sample_rate * (self.frame_duration_ms / 1000.0))
+            size = self._frame_bytes[sample_rate] = num_samples_per_frame * bytes_per_sample
+        return size
+
+    def frame_generator(self, audio, sample_rate: int) -> Generator[np.ndarray, None, None]:
+        """Generate audio frames of fixed size from raw audio.
+
+        The audio is reshaped into a (frames, frame_size) uint8 view in one step, and the
+        rows are zero-copy views of the input, so they are only valid while the
+        underlying buffer is left unmodified.
+
+        Parameters:
+            audio: The raw 16-bit PCM audio data, as bytes or any C-contiguous buffer such as an int16 array.
             sample_rate (int): The audio sample rate.
 
         Yields:
-            Generator[bytes, None, None]: Stream of audio frames.
+            Generator[np.ndarray, None, None]: Stream of audio frames, each frame_size bytes long.
+        """
+        yield from self._frames(audio, sample_rate)
+
+    def _frames(self, audio, sample_rate: int) -> np.ndarray:
+        """Return the whole frames of audio as a zero-copy (frames, frame_size) uint8 array."""
+        frame_size = self.frame_size(sample_rate)
+        view = memoryview(audio).cast('B')
+        # A trailing partial frame is dropped.
+        num_frames = len(view) // frame_size
+        frames = np.frombuffer(view[:num_frames * frame_size], dtype=np.uint8)
+        return frames.reshape(num_frames, frame_size)
+
+    def quiet_frames(self, audio, sample_rate: int) -> np.ndarray:
+        """Flag the frames whose peak amplitude is below silence_threshold.
+
+        The peaks come from vectorized per-frame min/max reductions, which are far
+        cheaper than running the VAD on each frame.
+
+        Parameters:
+            audio: The raw 16-bit PCM audio data, as bytes or any C-contiguous buffer such as an int16 array.
+            sample_rate (int): The audio sample rate.
+
+        Returns:
+            np.ndarray: One bool per whole frame of audio, as yielded by frame_generator.
+        """
+        frames = self._frames(audio, sample_rate)
+        threshold = self.silence_threshold
+        if not threshold:
+            return np.zeros(len(frames), dtype=np.bool_)
+        samples = frames.view(np.int16)
+        # max/min rather than abs(), which overflows for -32768.
+        return (samples.max(axis=1) < threshold) & (samples.min(axis=1) > -threshold)
+
+    def calibrate(self, audio, sample_rate: int) -> int:
+        """Pick the VAD mode and silence threshold from the noise floor of sample audio.
+
+        The noise floor is the 10th percentile of the per-frame peak amplitude, the
+        same measure quiet_frames compares against the threshold, so a little speech
+        in the sample does not skew it. The silence threshold is set to 1.5 times the
+        floor, but never below the value the detector was created with, so calling
+        this again once the room quietens down lowers it back.
+
+        Parameters:
+            audio: Raw 16-bit PCM audio with little or no speech, such as the first
+                second or so of a session.
+            sample_rate (int): The audio sample rate.
+
+        Returns:
+            int: The VAD mode now in use; unchanged if audio holds no whole frame.
+        """
+        frames = self._frames(audio, sample_rate).view(np.int16)
+        if not len(frames):
+            return self.mode
+        # max/min rather than abs(), which overflows for -32768.
+        peaks = np.maximum(frames.max(axis=1).astype(np.int32), -frames.min(axis=1).astype(np.int32))
+        noise_floor = float(np.percentile(peaks, 10))
+        mode = next((m for bound, m in _CALIBRATION_MODES if noise_floor < bound), 3)
+        self.vad.set_mode(mode)
+        self.mode = mode
+        self.silence_threshold = max(self._base_silence_threshold, int(1.5 * noise_floor))
+        logger.info("VAD calibrated: noise floor %.0f, mode %d, silence threshold %d",
+                    noise_floor, mode, self.silence_threshold)
+        return mode
+
+    def scan_all(self, audio, sample_rate: int) -> np.ndarray:
+        """Classify every whole frame of audio in one pass.
+
+        This is the batch counterpart of vad_collector: it returns per-frame flags
+        for find_voiced_segments or speech_runs instead of concatenated audio.
+        Frames below silence_threshold are flagged silent without running the VAD.
+
+        Parameters:
+            audio: The raw 16-bit PCM audio data, as bytes or any C-contiguous buffer such as an int16 array.
+            sample_rate (int): The audio sample rate.
+
+        Returns:
+            np.ndarray: uint8 array with 1 for each voiced frame.
         """
-        bytes_per_sample = 2
-        num_samples_per_frame = int(sample_rate * (self.frame_duration_ms / 1000.0))
-        frame_size = num_samples_per_frame * bytes_per_sample
-        for offset in range(0, len(audio), frame_size):
-            if offset + frame_size > len(audio):
-                break
-            yield audio[offset:offset + frame_size]
-
-    def is_speech(self, audio: bytes, sample_rate: int) -> bool:
+        frames = self._frames(audio, sample_rate)
+        speech_flags = np.zeros(len(frames), dtype=np.uint8)
+        vad_is_speech = self.vad.is_speech
+        for i in np.flatnonzero(~self.quiet_frames(audio, sample_rate)):
+            speech_flags[i] = vad_is_speech(frames[i], sample_rate)
+        return speech_flags
+
+    def is_speech(self, audio, sample_rate: int) -> bool:
         """Determine if the majority of audio frames contain speech.
 
+        Classification stops as soon as the majority is decided either way, and frames
+        below silence_threshold count as silent without running the VAD.
+
         Parameters:
-            audio (bytes): The raw audio data.
+            audio: The raw 16-bit PCM audio data.
             sample_rate (int): The sample rate of the audio.
 
         Returns:
             bool: True if speech is detected, False otherwise.
         """
-        frames = list(self.frame_generator(audio, sample_rate))
-        if not frames:
-            return False
-
-        speech_frames = 0
-        for frame in frames:
-            if self.vad.is_speech(frame, sample_rate):
+        # The frame count comes from the buffer size, so the frames are never collected into a list.
+        num_frames = memoryview(audio).nbytes // self.frame_size(sample_rate)
+        # Speech needs strictly more than half of the frames; silence wins once it has the rest.
+        needed = num_frames // 2 + 1
+        allowed_silence = num_frames - needed
+        vad_is_speech = self.vad.is_speech
+        speech_frames = silent_frames = 0
+        quiet = self.quiet_frames(audio, sample_rate)
+        for frame, is_quiet in zip(self.frame_generator(audio, sample_rate), quiet):
+            if not is_quiet and vad_is_speech(frame, sample_rate):
                 speech_frames += 1
+                if speech_frames >= needed:
+                    return True
+            else:
+                silent_frames += 1
+                if silent_frames > allowed_silence:
+                    return False
+        return False
+
+
+def speech_runs(speech_flags: np.ndarray) -> np.ndarray:
+    """Find the runs of consecutive voiced frames, without any padding or hysteresis.
+
+    Parameters:
+        speech_flags (np.ndarray): uint8 array with 1 for each voiced frame, e.g. from scan_all.
+
+    Returns:
+        np.ndarray: An (n, 2) array of [start, end) frame index pairs.
+    """
+    edges = np.flatnonzero(np.diff(speech_flags.astype(np.int8), prepend=0, append=0))
+    return edges.reshape(-1, 2)
+
+
+@njit(cache=True)
+def find_voiced_segments(speech_flags: np.ndarray, num_padding_frames: int,
+                         triggered: bool = False) -> Tuple[np.ndarray, bool]:
+    """Run the padded trigger/detrigger state machine over per-frame speech flags.
+
+    The window holds the last num_padding_frames frames since the last state change.
+    Collection triggers when more than 90% of the window is voiced, starting at the
+    oldest frame in the window, and detriggers when more than 90% is unvoiced.
+
+    Parameters:
+        speech_flags (np.ndarray): uint8 array with 1 for each voiced frame.
+        num_padding_frames (int): Size of the sliding window in frames.
+        triggered (bool): Start out triggered, with a segment already open at the first
+            frame, such as the rest of a segment cut off in an earlier call.
+
+    Returns:
+        Tuple[np.ndarray, bool]: An (n, 2) int64 array of [start, end) frame index pairs,
+        and whether the last segment was still open (triggered) at the final frame.
+    """
+    n_frames = speech_flags.shape[0]
+    segments = np.empty((n_frames, 2), np.int64)
+    n_segments = 0
+    threshold = 0.9 * num_padding_frames
+    window_start = 0
+    voiced_in_window = 0
+    segment_start = 0
+    if num_padding_frames == 0:
+        return segments[:0], False
+    for i in range(n_frames):
+        if i - window_start >= num_padding_frames:
+            voiced_in_window -= speech_flags[window_start]
+            window_start += 1
+        voiced_in_window += speech_flags[i]
+        if not triggered:
+            if voiced_in_window > threshold:
+                triggered = True
+                segment_start = window_start
+                window_start = i + 1
+                voiced_in_window = 0
+        else:
+            if (i - window_start + 1) - voiced_in_window > threshold:
+                segments[n_segments, 0] = segment_start
+                segments[n_segments, 1] = i + 1
+                n_segments += 1
+                triggered = False
+                window_start = i + 1
+                voiced_in_window = 0
+    if triggered:
+        segments[n_segments, 0] = segment_start
+        segments[n_segments, 1] = n_frames
+        n_segments += 1
+    return segments[:n_segments], triggered
+
 
-        return speech_frames > len(frames) / 2
+@njit(cache=True)
+def trim_silence(samples: np.ndarray, threshold: int) -> Tuple[int, int]:
+    """Find the span of samples between the first and last one at or above threshold.
+
+    Parameters:
+        samples (np.ndarray): 1-D int16 audio samples.
+        threshold (int): Absolute amplitude below which a sample counts as silence.
+
+    Returns:
+        Tuple[int, int]: The [start, end) sample range to keep; empty if all samples are silent.
+    """
+    n = samples.shape[0]
+    start = 0
+    while start < n and abs(np.int32(samples[start])) < threshold:
+        start += 1
+    end = n
+    while end > start and abs(np.int32(samples[end - 1])) < threshold:
+        end -= 1
+    return start, end
 
 
 def vad_collector(sample_rate: int, frame_duration_ms: int,
                   padding_duration_ms: int, vad: webrtcvad.Vad, frames: Iterable[bytes]) -> Generator[bytes, None, None]:
     """Collect and yield voiced segments from audio frames using VAD.
 
+    Every frame is classified up front into a flag array, and the segment boundaries
+    are found by find_voiced_segments without any per-frame Python state.
+
     Parameters:
         sample_rate (int): The audio sample rate.
         frame_duration_ms (int): Duration of each frame in ms.
@@ -76,36 +293,17 @@ def vad_collector(sample_rate: int, frame_duration_ms: int,
         Generator[bytes, None, None]: Voiced audio segments concatenated as bytes.
     """
     num_padding_frames = int(padding_duration_ms / frame_duration_ms)
-    ring_buffer = collections.deque(maxlen=num_padding_frames)
-    triggered = False
-
-    voiced_frames = []
-    log = ""
-    for frame in frames:
-        is_speech = vad.is_speech(frame, sample_rate)
-        log += '1' if is_speech else '0'
-        if not triggered:
-            ring_buffer.append((frame, is_speech))
-            num_voiced = len([f for f, speech in ring_buffer if speech])
-            if num_voiced > 0.9 * ring_buffer.maxlen:
-                triggered = True
-                logger.debug('+')
-                for f, s in ring_buffer:
-                    voiced_frames.append(f)
-                ring_buffer.clear()
-        else:
-            voiced_frames.append(frame)
-            ring_buffer.append((frame, is_speech))
-            num_unvoiced = len([f for f, speech in ring_buffer if not speech])
-            if num_unvoiced > 0.9 * ring_buffer.maxlen:
-                logger.debug('-')
-                triggered = False
-                yield b''.join(voiced_frames)
-                ring_buffer.clear()
-                voiced_frames = []
-    if triggered:
-        logger.debug('-')
-    logger.debug(log)
-    logger.debug('\n')
-    if voiced_frames:
-        yield b''.join(voiced_frames)
+    frames = list(frames)
+    vad_is_speech = vad.is_speech
+    speech_flags = np.fromiter((vad_is_speech(frame, sample_rate) for frame in frames),
+                               dtype=np.uint8, count=len(frames))
+    dbg = logger.isEnabledFor(DEBUG)
+    if dbg:
+        logger.debug((speech_flags + ord('0')).tobytes().decode())
+    segments, _ = find_voiced_segments(speech_flags, num_padding_frames)
+    for start, end in segments:
+        if dbg:
+            logger.debug('+')
+        yield b''.join(frames[start:end])
+        if dbg:
+            logger.debug('-')